@@ -0,0 +1,224 @@
+import os
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+CHUNK_SIZE = 1024 * 1024                # bytes copied per read
+MEMBER_SPOOL_SIZE = 8 * 1024 * 1024     # compressed member bytes kept in RAM before spilling
+ZIP_WORKERS = min(8, os.cpu_count() or 4)
+ZIP_DEPTH = 2                           # members compressed ahead per worker
+
+# Already-compressed formats: deflate costs CPU here and saves next to nothing.
+INCOMPRESSIBLE = {
+    "jpg", "jpeg", "png", "gif", "webp", "heic", "jp2", "pdf",
+    "mp4", "mov", "m4v", "avi", "mkv", "webm", "mp3", "m4a", "aac", "ogg", "flac",
+    "zip", "7z", "rar", "gz", "tgz", "bz2", "xz", "zst",
+    "docx", "xlsx", "pptx", "odt", "ods", "odp", "epub",
+}
+
+_MAX32 = 0xFFFFFFFF
+_DESCRIPTOR = 0x08                      # CRC and sizes follow the data
+_UTF8 = 0x800
+
+
+def source_size(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, "size", None)
+    return size if isinstance(size, int) else None
+
+
+def iter_chunks(source, chunk_size: int = CHUNK_SIZE):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield view[i:i + chunk_size]
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter_chunks(f, chunk_size)
+        return
+
+    # In-memory files (uploads included) are read through a view of their
+    # buffer: no copy, and no shared cursor when several threads read the
+    # same upload.
+    if hasattr(source, "getbuffer"):
+        yield from iter_chunks(source.getbuffer(), chunk_size)
+        return
+
+    # Uploaded files survive Streamlit reruns, so their cursor may sit at EOF.
+    if hasattr(source, "seek"):
+        source.seek(0)
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def compressible(name: str) -> bool:
+    return name.rpartition(".")[2].lower() not in INCOMPRESSIBLE
+
+
+def _deflate(source, chunk_size: int):
+    # Raw deflate of one member into a spool; runs on a worker thread, zlib
+    # releases the GIL while it compresses.
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    spool = tempfile.SpooledTemporaryFile(max_size=MEMBER_SPOOL_SIZE)
+    crc = size = 0
+    for chunk in iter_chunks(source, chunk_size):
+        crc = zlib.crc32(chunk, crc)
+        size += len(chunk)
+        spool.write(compressor.compress(chunk))
+    spool.write(compressor.flush())
+    compressed = spool.tell()
+    spool.seek(0)
+    return crc, size, compressed, spool
+
+
+def _dos_time(t: float):
+    y, mo, d, h, mi, s = time.localtime(t)[:6]
+    return (h << 11) | (mi << 5) | (s // 2), ((y - 1980) << 9) | (mo << 5) | d
+
+
+class _ZipStream:
+    # Writes the ZIP format straight to a byte stream, in order, without
+    # seeking: deflated members arrive already compressed with their CRC and
+    # sizes, stored members are copied through and closed by a data
+    # descriptor. Sizes, offsets and entry counts past the classic limits
+    # switch to ZIP64 records.
+    def __init__(self):
+        self.offset = 0
+        self.entries = []
+        self.dostime, self.dosdate = _dos_time(time.time())
+
+    def _emit(self, data: bytes) -> bytes:
+        self.offset += len(data)
+        return data
+
+    def _name(self, name: str):
+        try:
+            return name.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return name.encode("utf-8"), _UTF8
+
+    def _local_header(self, name, flags, method, crc, compressed, size, zip64) -> bytes:
+        extra = b""
+        if zip64:
+            extra = struct.pack("<HHQQ", 1, 16, size, compressed)
+            compressed = size = _MAX32
+        return struct.pack(
+            "<4s5H3L2H", b"PK\x03\x04", 45 if zip64 else 20, flags, method,
+            self.dostime, self.dosdate, crc, compressed, size, len(name), len(extra),
+        ) + name + extra
+
+    def deflated(self, name: str, crc: int, size: int, compressed: int, data):
+        encoded, flags = self._name(name)
+        offset = self.offset
+        zip64 = size >= _MAX32 or compressed >= _MAX32
+        yield self._emit(self._local_header(encoded, flags, zipfile.ZIP_DEFLATED, crc, compressed, size, zip64))
+        while True:
+            chunk = data.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield self._emit(chunk)
+        self.entries.append((encoded, flags, zipfile.ZIP_DEFLATED, crc, compressed, size, offset))
+
+    def stored(self, name: str, source, chunk_size: int):
+        encoded, flags = self._name(name)
+        flags |= _DESCRIPTOR
+        offset = self.offset
+        known = source_size(source)
+        zip64 = known is None or known >= _MAX32
+        yield self._emit(self._local_header(encoded, flags, zipfile.ZIP_STORED, 0, 0, 0, zip64))
+        crc = size = 0
+        for chunk in iter_chunks(source, chunk_size):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            yield self._emit(bytes(chunk))
+        sizes = struct.pack("<QQ" if zip64 else "<LL", size, size)
+        yield self._emit(struct.pack("<4sL", b"PK\x07\x08", crc) + sizes)
+        self.entries.append((encoded, flags, zipfile.ZIP_STORED, crc, size, size, offset))
+
+    def close(self):
+        start = self.offset
+        for name, flags, method, crc, compressed, size, offset in self.entries:
+            extra = [v for v in (size, compressed, offset) if v >= _MAX32]
+            fields = (
+                _MAX32 if size >= _MAX32 else size,
+                _MAX32 if compressed >= _MAX32 else compressed,
+                _MAX32 if offset >= _MAX32 else offset,
+            )
+            extra = struct.pack(f"<HH{len(extra)}Q", 1, 8 * len(extra), *extra) if extra else b""
+            version = 45 if extra else 20
+            yield self._emit(struct.pack(
+                "<4s6H3L5H2L", b"PK\x01\x02", (3 << 8) | version, version, flags, method,
+                self.dostime, self.dosdate, crc, fields[1], fields[0], len(name), len(extra),
+                0, 0, 0, 0o600 << 16, fields[2],
+            ) + name + extra)
+
+        count, size = len(self.entries), self.offset - start
+        if count >= 0xFFFF or size >= _MAX32 or start >= _MAX32:
+            end64 = self.offset
+            yield self._emit(struct.pack(
+                "<4sQ2H2L4Q", b"PK\x06\x06", 44, 45, 45, 0, 0, count, count, size, start,
+            ))
+            yield self._emit(struct.pack("<4sLQL", b"PK\x06\x07", 0, end64, 1))
+            count, size, start = min(count, 0xFFFF), min(size, _MAX32), min(start, _MAX32)
+        yield self._emit(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, count, count, size, start, 0))
+
+
+def iter_zip(members, compression: int = zipfile.ZIP_DEFLATED, chunk_size: int = CHUNK_SIZE,
+             workers: int = None):
+    # Compressible members are deflated on a thread pool a few members
+    # ahead of the writer; everything is written in the order given, so the
+    # same members always give the same layout.
+    workers = workers or ZIP_WORKERS
+    stream = _ZipStream()
+    pending = deque()
+    members = iter(members)
+
+    def write(name, source, job):
+        if job is None:
+            yield from stream.stored(name, source, chunk_size)
+            return
+        crc, size, compressed, spool = job.result()
+        with spool:
+            yield from stream.deflated(name, crc, size, compressed, spool)
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="zip") as pool:
+        try:
+            for name, source in members:
+                job = None
+                if compression == zipfile.ZIP_DEFLATED and compressible(name):
+                    job = pool.submit(_deflate, source, chunk_size)
+                pending.append((name, source, job))
+                if len(pending) > workers * ZIP_DEPTH:
+                    yield from write(*pending.popleft())
+            while pending:
+                yield from write(*pending.popleft())
+        finally:
+            # An abandoned download stops the look-ahead and frees its spools.
+            for _, _, job in pending:
+                if job is not None and not job.cancel() and job.exception() is None:
+                    job.result()[3].close()
+    yield from stream.close()
+
+
+def write_zip(members, target, **kwargs) -> int:
+    written = 0
+    with metrics.timer("zip_build"):
+        for chunk in iter_zip(members, **kwargs):
+            target.write(chunk)
+            written += len(chunk)
+    metrics.count("zip_bytes", written)
+    return written
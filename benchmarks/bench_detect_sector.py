@@ -0,0 +1,74 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import re
+
+from classify import OUT_OF_SCOPE, SectorMatcher, detect_sector
+from keywords import KEYWORDS_BY_FAMILY
+
+PAGE_WORDS = 8_000          # roughly a 50 KB page after normalization
+KEYWORD_RATE = 0.02
+ROUNDS = 20
+
+
+def legacy_normalize(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r"[^a-zA-ZÀ-ž0-9\s]", " ", text)
+    return re.sub(r"\s+", " ", text)
+
+
+def legacy_detect_sector(text: str, keywords: dict) -> str:
+    text = legacy_normalize(text)
+    scores = {s: sum(1 for kw in kws if kw in text) for s, kws in keywords.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else OUT_OF_SCOPE
+
+
+def synthetic_page(keywords: dict, rng: random.Random) -> str:
+    kws = [kw for kws in keywords.values() for kw in kws]
+    vocab = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyzéöü", k=rng.randint(2, 10)))
+             for _ in range(3_000)]
+    words = [
+        rng.choice(kws) if rng.random() < KEYWORD_RATE else rng.choice(vocab)
+        for _ in range(PAGE_WORDS)
+    ]
+    return " ".join(words)
+
+
+def timed(fn, pages):
+    start = time.perf_counter()
+    results = [fn(page) for page in pages]
+    return (time.perf_counter() - start) / len(pages), results
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'family':<10} {'scan: legacy':>13} {'automaton':>10} {'speedup':>8}"
+          f" {'row: legacy':>12} {'new':>8} {'speedup':>8}   (ms/row)")
+    for family, keywords in KEYWORDS_BY_FAMILY.items():
+        pages = [synthetic_page(keywords, rng) for _ in range(ROUNDS)]
+        normalized = [legacy_normalize(p) for p in pages]
+        matcher = SectorMatcher(keywords)
+
+        def legacy_scan(text):
+            return [sum(1 for kw in kws if kw in text) for kws in keywords.values()]
+
+        scan_legacy, expected = timed(legacy_scan, normalized)
+        scan_fast, got = timed(matcher.scores, normalized)
+        assert got == expected, family
+
+        row_legacy, expected = timed(lambda p: legacy_detect_sector(p, keywords), pages)
+        row_fast, got = timed(lambda p: detect_sector(p, matcher), pages)
+        assert got == expected, family
+
+        print(f"{family:<10} {scan_legacy * 1e3:>13.3f} {scan_fast * 1e3:>10.3f}"
+              f" {scan_legacy / scan_fast:>7.1f}x {row_legacy * 1e3:>12.3f}"
+              f" {row_fast * 1e3:>8.3f} {row_legacy / row_fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import MAX_PAGE_BYTES, STREAM_CHUNK, PageTextExtractor, extract_text
+
+PAGE_SIZES = (100 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+ROUNDS = 3
+
+
+def synthetic_html(size: int, rng: random.Random) -> bytes:
+    words = ["bank", "loan", "school", "hotel", "the", "and", "of", "service", "data"]
+    parts = [
+        "<html><head><title>Example Bank</title>",
+        '<meta name="description" content="Loans, accounts and payments">',
+        "<style>body { color: red; }</style></head><body><h1>Welcome</h1>",
+    ]
+    length = sum(map(len, parts))
+    while length < size:
+        if rng.random() < 0.1:
+            block = "<script>var x = " + "1" * 2000 + ";</script>"
+        else:
+            block = "<p>" + " ".join(rng.choices(words, k=60)) + " <a href='#'>more</a></p>"
+        parts.append(block)
+        length += len(block)
+    parts.append("</body></html>")
+    return "".join(parts).encode("utf-8")
+
+
+def streamed(page: bytes) -> str:
+    extractor = PageTextExtractor("text/html; charset=utf-8")
+    for start in range(0, min(len(page), MAX_PAGE_BYTES), STREAM_CHUNK):
+        extractor.feed_bytes(page[start:start + STREAM_CHUNK])
+        if extractor.done:
+            break
+    return extractor.text()
+
+
+def timed(fn, arg):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(arg)
+    return (time.perf_counter() - start) / ROUNDS, result
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'page KB':>8} {'full parse ms':>14} {'streamed ms':>12} {'speedup':>8} {'text kept':>10}")
+    for size in PAGE_SIZES:
+        page = synthetic_html(size, rng)
+        full, full_text = timed(lambda p: extract_text(p.decode("utf-8")), page)
+        fast, fast_text = timed(streamed, page)
+        print(f"{size // 1024:>8} {full * 1e3:>14.1f} {fast * 1e3:>12.1f} {full / fast:>7.1f}x"
+              f" {len(fast_text) / len(full_text):>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import iter_zip
+from classify import compile_keywords, detect_sector
+from diff import find_new_files, normalize
+from keywords import KEYWORDS_BY_FAMILY
+from language import FAMILY_CHARS, STOPWORDS
+from nomen import compile_normalizer, rename_plan
+from scan import path_key
+
+NAME_SCALES = (3, 4, 5, 6)              # 10^n filenames
+ARCHIVE_SCALES = (3, 4, 5)              # 10^n archive members
+PAGES_PER_FAMILY = 20
+PAGE_WORDS = 8_000                      # roughly a 50 KB page
+KEYWORD_RATE = 0.02
+MEMBER_BYTES = 2 * 1024
+MIN_SECONDS = 0.5                       # each case repeats until it has run this long
+TOLERANCE = 0.25                        # slowdown or memory growth reported as a regression
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+EXTENSIONS = ["jpg", "JPG", "tif", "png", "pdf", "mp4", "zip", "docx", "csv"]
+NAME_WORDS = ["Rapport", "report", "Été", "final", "copie", "v2", "Ñandú", "scan", "IMG", "Straße"]
+
+
+# =========================
+# Synthetic data
+# =========================
+def synthetic_names(n: int, rng: random.Random) -> list:
+    names = []
+    for i in range(n):
+        words = rng.sample(NAME_WORDS, rng.randint(1, 3))
+        sep = rng.choice([" ", "_", "-", "__", " - "])
+        names.append(f"{sep.join(words)}{sep}{i:07d}.{rng.choice(EXTENSIONS)}")
+    return names
+
+
+def synthetic_page(family: str, rng: random.Random) -> str:
+    keywords = [kw for kws in KEYWORDS_BY_FAMILY[family].values() for kw in kws]
+    stopwords = list(STOPWORDS[family])
+    letters = "abcdefghijklmnopqrstuvwxyz" + FAMILY_CHARS[family]
+    vocab = ["".join(rng.choices(letters, k=rng.randint(2, 10))) for _ in range(3_000)]
+    words = []
+    for _ in range(PAGE_WORDS):
+        r = rng.random()
+        if r < KEYWORD_RATE:
+            words.append(rng.choice(keywords))
+        elif r < 0.3:
+            words.append(rng.choice(stopwords))
+        else:
+            words.append(rng.choice(vocab))
+    return " ".join(words)
+
+
+def synthetic_members(n: int, rng: random.Random) -> list:
+    # Text-like members that compress, with every tenth one random bytes.
+    text = (" ".join(NAME_WORDS) * (MEMBER_BYTES // 40 + 1)).encode()[:MEMBER_BYTES]
+    return [
+        (f"member_{i:07d}.{'jpg' if i % 10 == 0 else 'txt'}",
+         rng.randbytes(MEMBER_BYTES) if i % 10 == 0 else text)
+        for i in range(n)
+    ]
+
+
+# =========================
+# Cases
+# =========================
+def name_cases(scale: int, rng: random.Random):
+    n = 10 ** scale
+    names = synthetic_names(n, rng)
+    delivered = rng.sample(names, n // 2)
+    postprocessed = dict.fromkeys(names, b"")
+    paths = [f"batch {i % 97}.v{i % 3}/{name}" for i, name in enumerate(names)]
+
+    def nomen():
+        rename_plan.cache_clear()
+        compile_normalizer.cache_clear()
+        rename_plan(tuple(names))
+
+    yield f"diff.normalize/1e{scale}", n, lambda: [normalize(name) for name in names]
+    yield f"scan.path_key/1e{scale}", n, lambda: [path_key(p) for p in paths]
+    yield f"diff.find_new_files/1e{scale}", n, lambda: find_new_files(delivered, postprocessed)
+    yield f"nomen.rename_plan/1e{scale}", n, nomen
+
+
+def page_cases(rng: random.Random):
+    for family, keywords in KEYWORDS_BY_FAMILY.items():
+        pages = [synthetic_page(family, rng) for _ in range(PAGES_PER_FAMILY)]
+        matcher = compile_keywords(keywords)
+        yield (f"classify.detect_sector/{family}", len(pages),
+               lambda pages=pages, matcher=matcher: [detect_sector(p, matcher) for p in pages])
+
+
+def archive_cases(scale: int, rng: random.Random):
+    members = synthetic_members(10 ** scale, rng)
+
+    def build():
+        for _ in iter_zip(members):
+            pass
+
+    yield f"archive.iter_zip/1e{scale}", len(members), build
+
+
+# =========================
+# Measurement
+# =========================
+def measure(run, items: int) -> dict:
+    run()                               # warm caches and imports
+    rounds, elapsed = 0, 0.0
+    while elapsed < MIN_SECONDS:
+        start = time.perf_counter()
+        run()
+        elapsed += time.perf_counter() - start
+        rounds += 1
+    seconds = elapsed / rounds
+
+    # Peak memory comes from a separate traced run so tracing never skews timings.
+    gc.collect()
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"items": items, "seconds": seconds, "items_per_s": items / seconds, "peak_bytes": peak}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if now["items_per_s"] < before["items_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {now['items_per_s']:.0f}/s, baseline {before['items_per_s']:.0f}/s"
+            )
+        if now["peak_bytes"] > before["peak_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak {now['peak_bytes'] / 2**20:.1f} MiB, "
+                f"baseline {before['peak_bytes'] / 2**20:.1f} MiB"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Throughput and peak memory of the hot paths")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(NAME_SCALES),
+                        help="filename scales as powers of ten")
+    parser.add_argument("--archive-scales", type=int, nargs="+", default=list(ARCHIVE_SCALES),
+                        help="archive member counts as powers of ten")
+    parser.add_argument("--only", default="", help="run cases whose name contains this text")
+    parser.add_argument("--save", nargs="?", const=BASELINE, metavar="PATH",
+                        help="store the results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=BASELINE, metavar="PATH",
+                        help="compare against a stored baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    cases = [c for scale in args.scales for c in name_cases(scale, rng)]
+    cases += page_cases(rng)
+    cases += [c for scale in args.archive_scales for c in archive_cases(scale, rng)]
+
+    results = {}
+    print(f"{'case':<36} {'items/s':>12} {'ms/run':>10} {'peak MiB':>9}")
+    for name, items, run in cases:
+        if args.only not in name:
+            continue
+        r = results[name] = measure(run, items)
+        print(f"{name:<36} {r['items_per_s']:>12.0f} {r['seconds'] * 1e3:>10.2f}"
+              f" {r['peak_bytes'] / 2**20:>9.1f}", flush=True)
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if not regressions:
+            print(f"no regressions against {args.compare}")
+        status = 1 if regressions else 0
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.save}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import multiprocessing
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import ahocorasick
+import numpy as np
+
+import metrics
+
+OUT_OF_SCOPE = "Out of domain scope"
+CLASSIFY_CHUNK_ROWS = 50_000    # rows scored per keyword-matrix product
+CLASSIFY_WORKERS = os.cpu_count() or 4
+POOL_DEPTH = 2                  # frames queued per worker process before the reader waits
+
+_NON_WORD = re.compile(r"[^a-zA-ZÀ-ž0-9\s]")
+_ROW_NON_WORD = re.compile(r"[^a-zA-ZÀ-ž0-9\s\x00]")
+
+
+def normalize(text: str) -> str:
+    cleaned = _NON_WORD.sub(" ", text.lower())
+    words = cleaned.split()
+
+    # Same result as re.sub(r"\s+", " ", cleaned), which keeps a single
+    # space at either end, but without a regex pass over every separator.
+    if not words:
+        return " " if cleaned else ""
+    lead = " " if cleaned[0].isspace() else ""
+    trail = " " if cleaned[-1].isspace() else ""
+    return lead + " ".join(words) + trail
+
+
+class SectorMatcher:
+    # All keywords of one family compiled into a single Aho-Corasick
+    # automaton. A sector scores one point per keyword entry that occurs as a
+    # substring of the normalized text, exactly like `kw in text`, but the
+    # text is scanned once instead of once per keyword.
+    def __init__(self, keywords: dict):
+        self.sectors = list(keywords)
+        patterns = {}
+        for si, kws in enumerate(keywords.values()):
+            for kw in kws:
+                # Duplicates within a list count twice, as with the old scan.
+                patterns.setdefault(kw, []).append(si)
+
+        self.patterns = list(patterns)
+        self._sector_ids = list(patterns.values())
+
+        # keyword x sector counts, used to score whole frames at once
+        self.keyword_matrix = np.zeros((len(self.patterns), len(self.sectors)), dtype=np.int16)
+        for pid, sector_ids in enumerate(self._sector_ids):
+            for si in sector_ids:
+                self.keyword_matrix[pid, si] += 1
+
+        self._automaton = ahocorasick.Automaton()
+        for pid, kw in enumerate(patterns):
+            self._automaton.add_word(kw, pid)
+        self._automaton.make_automaton()
+
+    def occurrences(self, text: str):
+        # (end offset, keyword id) pairs, overlapping matches included
+        return self._automaton.iter(text) if self.patterns else iter(())
+
+    def scores(self, text: str) -> list:
+        scores = [0] * len(self.sectors)
+        for pid in {pid for _, pid in self.occurrences(text)}:
+            for si in self._sector_ids[pid]:
+                scores[si] += 1
+        return scores
+
+    def best(self, text: str) -> str:
+        scores = self.scores(text)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return self.sectors[best] if scores[best] > 0 else OUT_OF_SCOPE
+
+
+_matchers = {}
+
+
+def compile_keywords(keywords: dict) -> SectorMatcher:
+    # Keyed by identity; the dict is kept alongside so its id stays unique.
+    entry = _matchers.get(id(keywords))
+    if entry is None or entry[0] is not keywords:
+        entry = _matchers[id(keywords)] = (keywords, SectorMatcher(keywords))
+    return entry[1]
+
+
+def _matcher(keywords) -> SectorMatcher:
+    return keywords if isinstance(keywords, SectorMatcher) else compile_keywords(keywords)
+
+
+@metrics.timed("detect_sector")
+def detect_sector(text: str, keywords) -> str:
+    return _matcher(keywords).best(normalize(text))
+
+
+def _row_texts(df, columns, extra=None):
+    # Same text as f"{row[a]} {row[c]}" + " " + web_text, built column-wise.
+    texts = None
+    for col in columns:
+        values = df[col].astype(object).map(str)
+        texts = values if texts is None else texts + " " + values
+    if extra is not None:
+        texts = texts + " " + np.asarray(extra, dtype=object)
+    return texts
+
+
+def _normalize_rows(texts):
+    # Normalize a whole chunk as one string. Rows are joined with NUL, which
+    # survives normalization and cannot occur inside a keyword, so matches
+    # never straddle two rows. (Whitespace is collapsed with split/join here,
+    # which may trim a row's edge spaces; keywords never start or end with one.)
+    texts = texts.tolist()
+    blob = "\x00".join(texts)
+    if blob.count("\x00") != len(texts) - 1:
+        blob = "\x00".join(t.replace("\x00", " ") for t in texts)
+
+    cleaned = _ROW_NON_WORD.sub(" ", blob.lower())
+    normalized = " ".join(cleaned.split())
+
+    lengths = np.fromiter(map(len, normalized.split("\x00")), dtype=np.int64, count=len(texts))
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    return normalized, starts
+
+
+def _score_texts(texts, matcher):
+    # Labels for at most CLASSIFY_CHUNK_ROWS row texts.
+    labels = np.array(matcher.sectors + [OUT_OF_SCOPE], dtype=object)
+    normalized, starts = _normalize_rows(texts)
+
+    # (end offset, keyword id) for every occurrence, in one automaton pass
+    hits = np.fromiter(
+        chain.from_iterable(matcher.occurrences(normalized)),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    rows = np.searchsorted(starts, hits[:, 0], side="right") - 1
+
+    present = np.zeros((len(texts), len(matcher.patterns)), dtype=np.int16)
+    present[rows, hits[:, 1]] = 1
+
+    scores = present @ matcher.keyword_matrix
+    best = scores.argmax(axis=1)        # first sector wins ties, like max()
+    best[scores[np.arange(len(best)), best] == 0] = len(matcher.sectors)
+    return labels[best]
+
+
+@metrics.timed("classify_rows")
+def _classify_rows(df, columns, matcher, extra=None):
+    metrics.count("rows_classified", len(df))
+    result = np.empty(len(df), dtype=object)
+
+    for start in range(0, len(df), CLASSIFY_CHUNK_ROWS):
+        stop = min(start + CLASSIFY_CHUNK_ROWS, len(df))
+        chunk_extra = None if extra is None else extra[start:stop]
+        result[start:stop] = _score_texts(_row_texts(df.iloc[start:stop], columns, chunk_extra), matcher)
+
+    return result
+
+
+def classify_frame(df, columns, keywords, extra=None, column: str = "Sector"):
+    df[column] = _classify_rows(df, columns, _matcher(keywords), extra)
+    return df[column]
+
+
+def classify_frame_by_family(df, columns, families, keywords_by_family: dict,
+                             extra=None, column: str = "Sector", unsupported=OUT_OF_SCOPE):
+    # families holds one entry per row; rows are grouped so each family's
+    # automaton runs once over its own rows. Unknown families get `unsupported`.
+    families = np.asarray(families, dtype=object)
+    extra = None if extra is None else np.asarray(extra, dtype=object)
+    result = np.full(len(df), unsupported, dtype=object)
+
+    for family in dict.fromkeys(families.tolist()):
+        if family not in keywords_by_family:
+            continue
+        idx = np.flatnonzero(families == family)
+        result[idx] = _classify_rows(
+            df.iloc[idx], columns, _matcher(keywords_by_family[family]),
+            None if extra is None else extra[idx]
+        )
+
+    df[column] = result
+    return df[column]
+
+
+def _route(texts, default):
+    from language import route_families     # language imports this module
+
+    return route_families(texts, default=default)
+
+
+def classify_frames(frames, keywords_by_family: dict, column: str = "Sector",
+                    unsupported=OUT_OF_SCOPE):
+    # frames yields (df, columns, document family, web texts or None). Each
+    # row is routed to its own family from its column text (unclear rows
+    # keep the document's), then classified. Yields (df, families) in order,
+    # with df[column] filled. ClassifyPool.classify_frames does the same on
+    # worker processes.
+    for df, columns, default, extra in frames:
+        families = _route(_row_texts(df, columns).tolist(), default)
+        classify_frame_by_family(df, columns, families, keywords_by_family, extra, column, unsupported)
+        yield df, families
+
+
+# =========================
+# Process pool
+# =========================
+_worker = {}
+
+
+def _init_worker(keywords_by_family: dict, unsupported):
+    # Runs once per worker process: the keyword tables arrive with the
+    # process and are compiled there, never shipped again per chunk.
+    _worker["matchers"] = {family: SectorMatcher(kws) for family, kws in keywords_by_family.items()}
+    _worker["unsupported"] = unsupported
+
+
+def _classify_part(texts: list, extra, default):
+    # Routing runs here too: langdetect on unclear rows costs far more than
+    # scoring them.
+    families = _route(texts, default)
+    if extra is not None:
+        texts = [t + " " + e for t, e in zip(texts, extra)]
+    texts = np.asarray(texts, dtype=object)
+    families = np.asarray(families, dtype=object)
+    result = np.full(len(texts), _worker["unsupported"], dtype=object)
+
+    for family in dict.fromkeys(families.tolist()):
+        matcher = _worker["matchers"].get(family)
+        if matcher is None:
+            continue
+        idx = np.flatnonzero(families == family)
+        for start in range(0, len(idx), CLASSIFY_CHUNK_ROWS):
+            part = idx[start:start + CLASSIFY_CHUNK_ROWS]
+            result[part] = _score_texts(texts[part], matcher)
+    return families.tolist(), result
+
+
+class ClassifyPool:
+    # classify_frames on worker processes, for inputs large enough that one
+    # core is the bottleneck. Frames travel as their joined row texts and
+    # web texts; results come back in submission order.
+    def __init__(self, keywords_by_family: dict, workers=None, unsupported=OUT_OF_SCOPE,
+                 context=None):
+        self.workers = workers or CLASSIFY_WORKERS
+        # forkserver (else spawn) by default: workers never inherit the
+        # caller's threads or the locks they hold. "fork" is for hosts where
+        # re-importing __main__ is not possible, such as Streamlit, which
+        # makes the app script __main__; those workers are all forked here,
+        # once, rather than later from whatever threads are running by then.
+        if context is None:
+            context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(context),
+            initializer=_init_worker, initargs=(keywords_by_family, unsupported)
+        )
+        if context == "fork":
+            self._pool.submit(int).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(cancel_futures=True)
+
+    def submit(self, df, columns, default=None, extra=None):
+        # Future of (families, labels) for df's rows.
+        texts = _row_texts(df, columns).tolist()
+        extra = None if extra is None else [str(e) for e in extra]
+        return self._pool.submit(_classify_part, texts, extra, default)
+
+    def classify_frames(self, frames, column: str = "Sector", depth=None):
+        # Same contract as classify_frames; up to `depth` frames are in
+        # flight while the caller handles the oldest one.
+        depth = depth or self.workers * POOL_DEPTH
+
+        def finish(df, future):
+            families, labels = future.result()
+            df[column] = labels
+            return df, families
+
+        pending = deque()
+        for df, columns, default, extra in frames:
+            metrics.count("rows_classified", len(df))
+            pending.append((df, self.submit(df, columns, default, extra)))
+            while pending and (len(pending) > depth or pending[0][1].done()):
+                yield finish(*pending.popleft())
+        while pending:
+            yield finish(*pending.popleft())
@@ -0,0 +1,381 @@
+import argparse
+import os
+import sys
+import time
+
+EXIT_OK = 0
+EXIT_ERROR = 1                  # unreadable input or an input the tools reject
+LOG_INTERVAL = 5.0              # seconds between progress lines
+UNSUPPORTED = "Unsupported language"
+WATCH_BATCH_SECONDS = 60.0      # arrivals collected into one ZIP with watch --zip-dir
+
+
+def _log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+class InputError(Exception):
+    pass
+
+
+def _seconds(value: str) -> float:
+    seconds = float(value)
+    if not seconds > 0:
+        raise argparse.ArgumentTypeError(f"must be a positive number of seconds: {value}")
+    return seconds
+
+
+def _read_chunks(path: str, columns):
+    # Reader failures, including corrupt workbooks, surface as InputError;
+    # anything raised while processing a chunk is not mistaken for one.
+    import zipfile
+
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    from ingest import iter_table
+
+    try:
+        yield from iter_table(path, columns=columns)
+    except (OSError, ValueError, zipfile.BadZipFile, InvalidFileException) as e:
+        raise InputError(f"cannot read {path}: {e}") from e
+
+
+def _open_output(path):
+    if path in (None, "-"):
+        return sys.stdout.buffer, False
+    return open(path, "wb"), True
+
+
+# =========================
+# diff
+# =========================
+def run_diff(args) -> int:
+    from archive import write_zip
+    from diff import find_changed_files
+    from scan import iter_new_files, list_files, match_key
+
+    # Folder trees are matched on file names with the same rules as the
+    # upload-based diff, or on whole relative paths with --match-paths.
+    started = time.perf_counter()
+    try:
+        if args.changed:
+            delivery = list_files(args.delivery, args.workers)
+            postprocessed = list_files(args.postprocessed, args.workers)
+            new, changed = find_changed_files(
+                delivery, postprocessed, workers=args.workers, key=match_key(args.match_paths)
+            )
+            selected = iter(new + changed)
+        else:
+            selected = iter_new_files(
+                args.delivery, args.postprocessed, args.workers, match_paths=args.match_paths
+            )
+
+        count = 0
+
+        def counted(members):
+            nonlocal count
+            for member in members:
+                count += 1
+                yield member
+
+        if args.zip:
+            out, close = _open_output(args.zip)
+            try:
+                written = write_zip(counted(selected), out)
+            finally:
+                if close:
+                    out.close()
+            _log(f"wrote {written} bytes to {args.zip}")
+        else:
+            for rel, _ in counted(selected):
+                print(rel)
+            sys.stdout.flush()
+    except OSError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+
+    _log(f"diff: {count} files selected in {time.perf_counter() - started:.2f}s")
+    return EXIT_OK
+
+
+# =========================
+# dupes
+# =========================
+def run_dupes(args) -> int:
+    import io
+
+    from duplicates import find_duplicates, write_report
+    from scan import list_files
+
+    started = time.perf_counter()
+    try:
+        folders = {root: list_files(root, args.workers) for root in args.folders}
+        clusters = find_duplicates(
+            folders, workers=args.workers,
+            cross_folder=not args.within, min_size=0 if args.empty else 1
+        )
+    except OSError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+
+    out, close = _open_output(args.output)
+    try:
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        rows = write_report(clusters, text)
+        text.flush()
+        text.detach()       # leave closing the byte stream to us
+    finally:
+        if close:
+            out.close()
+
+    files = sum(len(f) for f in folders.values())
+    _log(
+        f"dupes: {len(clusters)} clusters ({rows} files) among {files} files "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return EXIT_OK
+
+
+# =========================
+# classify
+# =========================
+def run_classify(args) -> int:
+    from classify import ClassifyPool, classify_frames
+    from export import export_format, export_types, open_writer
+    from keywords import KEYWORDS_BY_FAMILY, LANGUAGE_TO_FAMILY
+    from language import detect_document_language
+
+    from fetcher import FetchStream, prefetch
+
+    fmt = export_format(args.output)
+    if fmt not in export_types():
+        _log(f"error: {fmt} output needs pyarrow")
+        return EXIT_ERROR
+
+    started = time.perf_counter()
+    # Worker processes come from a fork server, and before the fetch thread
+    # starts, so they share nothing with it.
+    pool = None
+    if args.processes:
+        pool = ClassifyPool(KEYWORDS_BY_FAMILY, workers=args.processes, unsupported=UNSUPPORTED)
+
+    cache = stream = None
+    if args.web:
+        from pagecache import PageCache
+        cache = PageCache(**({"path": args.page_cache} if args.page_cache else {}))
+        stream = FetchStream(cache=cache)
+
+    def submit(df):
+        # Column D of each chunk joins the shared fetch queue as soon as it is read.
+        if stream is None:
+            return None
+        return stream.submit(df.iloc[:, 2].astype(str).str.strip().tolist())
+
+    def frames():
+        # (chunk, columns, document family, web texts) for each chunk, in order.
+        family = None
+        chunks = prefetch(_read_chunks(args.input, [0, 2, 3]), submit)
+        for n, (df, batch) in enumerate(chunks):
+            col_a, col_c, _ = df.columns
+            if n == 0:
+                lang = detect_document_language(df, [col_a, col_c])
+                family = LANGUAGE_TO_FAMILY.get(lang)
+                _log(f"first chunk after {time.perf_counter() - started:.2f}s, language {lang}")
+
+            web_texts = batch.wait() if batch is not None else None
+            yield df, [col_a, col_c], family, web_texts
+
+    # Columns A, C and D, read and classified one chunk at a time; the
+    # output (CSV, XLSX or Parquet by extension) grows as chunks finish.
+    out, close = _open_output(args.output)
+    writer = open_writer(out, fmt)
+    rows, logged = 0, time.perf_counter()
+    try:
+        if pool is not None:
+            classified = pool.classify_frames(frames())
+        else:
+            classified = classify_frames(frames(), KEYWORDS_BY_FAMILY, unsupported=UNSUPPORTED)
+        for df, _ in classified:
+            writer.write(df)
+            rows += len(df)
+            if time.perf_counter() - logged >= LOG_INTERVAL:
+                logged = time.perf_counter()
+                _log(f"{rows} rows classified after {logged - started:.2f}s")
+    except InputError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+    except OSError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+    finally:
+        writer.close()
+        if close:
+            out.close()
+        if pool is not None:
+            pool.close()
+        if stream is not None:
+            stream.close()
+        if cache is not None:
+            _log(f"page cache hit rate {cache.hit_rate():.0%}")
+            cache.close()
+
+    _log(f"classify: {rows} rows in {time.perf_counter() - started:.2f}s")
+    return EXIT_OK
+
+
+# =========================
+# watch
+# =========================
+def run_watch(args) -> int:
+    import signal
+
+    from archive import write_zip
+    from scan import delivered_index
+    from watch import POLL_INTERVAL, Watcher
+
+    # The delivery tree is indexed once; after the first listing of the
+    # postprocessed tree, only arrivals cost anything.
+    started = time.perf_counter()
+    try:
+        delivered = delivered_index(args.delivery, args.workers, match_paths=args.match_paths)
+        watcher = Watcher(
+            args.postprocessed, delivered, poll_interval=args.poll or POLL_INTERVAL,
+            use_inotify=args.poll is None, match_paths=args.match_paths,
+            on_fallback=lambda e: _log(f"inotify failed ({e}); polling every {watcher.poll_interval:g}s"),
+        )
+    except OSError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+    _log(
+        f"watching {args.postprocessed} ({watcher.mode}) after {time.perf_counter() - started:.2f}s: "
+        f"{len(delivered)} delivered names, {len(watcher.existing)} undelivered files present"
+    )
+
+    # Stopped by Ctrl-C or, as a service, SIGTERM; the last batch is still packaged.
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+    batch, since, total, zips = [], None, 0, 0
+
+    def arrived(entries):
+        nonlocal since, total
+        for rel, _ in entries:
+            print(rel, flush=True)
+        total += len(entries)
+        if args.zip_dir and entries:
+            batch.extend(entries)
+            since = since or time.monotonic()
+
+    def package():
+        # Files removed since they arrived are left out.
+        nonlocal batch, since, zips
+        members = [(rel, path) for rel, path in batch if os.path.exists(path)]
+        batch, since = [], None
+        if not members:
+            return
+        zips += 1
+        path = os.path.join(args.zip_dir, time.strftime(f"new-%Y%m%d-%H%M%S-{zips:04d}.zip"))
+        with open(f"{path}.tmp", "wb") as out:
+            written = write_zip(members, out)
+        os.replace(f"{path}.tmp", path)
+        _log(f"wrote {len(members)} files ({written} bytes) to {path}")
+
+    try:
+        if args.existing:
+            arrived(watcher.existing)
+        for entries in watcher.batches():
+            arrived(entries)
+            if batch and time.monotonic() - since >= args.batch_seconds:
+                package()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+    finally:
+        watcher.close()
+
+    try:
+        if batch:
+            package()
+    except OSError as e:
+        _log(f"error: {e}")
+        return EXIT_ERROR
+    _log(f"watch: {total} new files in {time.perf_counter() - started:.0f}s")
+    return EXIT_OK
+
+
+# =========================
+# Entry point
+# =========================
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="porticus", description="Porticus batch tools")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write stage timings and counters (.prom: Prometheus textfile, else JSON)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("diff", help="list or package postprocessed files not yet delivered")
+    p.add_argument("delivery", help="directory tree of delivered files")
+    p.add_argument("postprocessed", help="directory tree of postprocessed files")
+    p.add_argument("--changed", action="store_true",
+                   help="also select delivered files whose content changed")
+    p.add_argument("--match-paths", action="store_true",
+                   help="match whole relative paths instead of file names (same layout in both trees)")
+    p.add_argument("--zip", metavar="PATH", help="write a ZIP instead of listing names (- for stdout)")
+    p.add_argument("--workers", type=int, default=None, help="threads for scanning and hashing")
+    p.set_defaults(run=run_diff)
+
+    p = sub.add_parser("dupes", help="report byte-identical files across folder trees")
+    p.add_argument("folders", nargs="+", help="directory trees to compare")
+    p.add_argument("-o", "--output", metavar="PATH", help="CSV report (default stdout)")
+    p.add_argument("--within", action="store_true",
+                   help="also report clusters found inside a single folder")
+    p.add_argument("--empty", action="store_true", help="also report empty files")
+    p.add_argument("--workers", type=int, default=None, help="threads for scanning and hashing")
+    p.set_defaults(run=run_dupes)
+
+    p = sub.add_parser("classify", help="classify URL rows of a spreadsheet")
+    p.add_argument("input", help=".xlsx, .csv or .parquet file; columns A, C and D are used")
+    p.add_argument("-o", "--output", metavar="PATH", help=".csv, .xlsx or .parquet output (default CSV on stdout)")
+    p.add_argument("--web", action="store_true", help="also use fetched webpage content")
+    p.add_argument("--page-cache", metavar="PATH", default=None,
+                   help="page cache database (default from PORTICUS_PAGE_CACHE)")
+    p.add_argument("--processes", type=int, default=0, metavar="N",
+                   help="classify on N worker processes (default: in this process)")
+    p.set_defaults(run=run_classify)
+
+    p = sub.add_parser("watch", help="report postprocessed files as they land, unless already delivered")
+    p.add_argument("delivery", help="directory tree of delivered files")
+    p.add_argument("postprocessed", help="directory tree to watch")
+    p.add_argument("--existing", action="store_true",
+                   help="first report undelivered files already present")
+    p.add_argument("--zip-dir", metavar="DIR", help="also package arrivals as ZIPs in DIR")
+    p.add_argument("--batch-seconds", type=float, default=WATCH_BATCH_SECONDS,
+                   help="seconds of arrivals per ZIP")
+    p.add_argument("--match-paths", action="store_true",
+                   help="match whole relative paths instead of file names (same layout in both trees)")
+    p.add_argument("--poll", type=_seconds, default=None, metavar="SECONDS",
+                   help="scan every SECONDS instead of using inotify (network volumes)")
+    p.add_argument("--workers", type=int, default=None, help="threads for scanning the delivery tree")
+    p.set_defaults(run=run_watch)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.metrics:
+        return args.run(args)
+
+    import metrics
+
+    metrics.enable()
+    try:
+        return args.run(args)
+    finally:
+        metrics.registry.write(args.metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
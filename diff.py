@@ -1,3 +1,7 @@
+from fingerprint import identical_groups
+from nameindex import DeliveredIndex
+
+
 def normalize(filename: str) -> str:
     name = filename.lower().strip()
     if "." in name:
@@ -6,10 +10,38 @@ def normalize(filename: str) -> str:
 
 
 def find_new_files(delivery_filenames, postprocessed_files):
-    delivery_set = {normalize(name) for name in delivery_filenames}
-
+    # The delivered side is held as a DeliveredIndex (one 64-bit hash per
+    # name) rather than a set of strings; a prebuilt index of normalized
+    # names, such as one opened from disk, is used as is.
+    if isinstance(delivery_filenames, DeliveredIndex):
+        delivered = delivery_filenames
+    else:
+        delivered = DeliveredIndex.build(normalize(name) for name in delivery_filenames)
     return [
-        (filename, data)
-        for filename, data in postprocessed_files.items()
-        if normalize(filename) not in delivery_set
+        (filename, postprocessed_files[filename])
+        for filename in delivered.missing(postprocessed_files, key=normalize)
     ]
+
+
+def find_changed_files(delivery_files, postprocessed_files, workers=None, key=normalize):
+    delivered = {}
+    for name, data in delivery_files.items():
+        delivered.setdefault(key(name), []).append((None, data))
+
+    new, matched, groups = [], [], {}
+    for filename, data in postprocessed_files.items():
+        name = key(filename)
+        if name not in delivered:
+            new.append((filename, data))
+            continue
+        matched.append((filename, data))
+        groups.setdefault(name, list(delivered[name])).append((filename, data))
+
+    # A postprocessed file is unchanged if it ends up grouped with a delivered one.
+    unchanged = set()
+    for group in identical_groups(groups.values(), workers=workers):
+        if any(key is None for key, _ in group):
+            unchanged.update(key for key, _ in group if key is not None)
+
+    changed = [(filename, data) for filename, data in matched if filename not in unchanged]
+    return new, changed
@@ -0,0 +1,46 @@
+import csv
+
+from fingerprint import content_size, identical_groups
+
+REPORT_HEADER = ["cluster", "folder", "filename", "size"]
+
+
+def find_duplicates(folders: dict, workers=None, cross_folder: bool = True,
+                    min_size: int = 1) -> list:
+    # folders: folder label -> {filename: data}. Returns clusters of
+    # (folder, filename, data) with byte-identical content, largest files
+    # first. Sizes are compared before anything is read, and only files
+    # that still collide after hashing both ends are hashed in full.
+    # By default a cluster must span at least two folders, and files smaller
+    # than min_size (empty ones) are never reported.
+    def keep(keys, size):
+        if size < min_size:
+            return False
+        return not cross_folder or len({label for label, _ in keys}) > 1
+
+    members = [
+        ((label, filename), data)
+        for label, files in folders.items()
+        for filename, data in files.items()
+    ]
+    clusters = [
+        [(label, filename, data) for (label, filename), data in group]
+        for group in identical_groups([members], workers=workers, keep=keep)
+    ]
+    for cluster in clusters:
+        cluster.sort(key=lambda m: (str(m[0]), m[1]))
+    clusters.sort(key=lambda c: (-content_size(c[0][2]), str(c[0][0]), c[0][1]))
+    return clusters
+
+
+def write_report(clusters, target) -> int:
+    # One row per file; rows of the same cluster share its number.
+    writer = csv.writer(target)
+    writer.writerow(REPORT_HEADER)
+    rows = 0
+    for n, cluster in enumerate(clusters, 1):
+        size = content_size(cluster[0][2])
+        for label, filename, _ in cluster:
+            writer.writerow([n, label, filename, size])
+            rows += 1
+    return rows
@@ -0,0 +1,101 @@
+import importlib.util
+
+EXPORT_TYPES = ["csv", "xlsx", "parquet"]
+XLSX_MAX_ROWS = 1_048_576       # Excel's sheet limit, header included
+
+
+def export_types() -> list:
+    # Parquet needs pyarrow, which is not a hard requirement.
+    if importlib.util.find_spec("pyarrow") is None:
+        return [t for t in EXPORT_TYPES if t != "parquet"]
+    return list(EXPORT_TYPES)
+
+
+def export_format(name) -> str:
+    # Format from a file name; anything unknown (or no name) is CSV.
+    ext = str(name or "").rsplit(".", 1)[-1].lower()
+    return ext if ext in EXPORT_TYPES else "csv"
+
+
+class _CsvWriter:
+    def __init__(self, target, header=True):
+        self.target, self.header = target, header
+
+    def write(self, df):
+        df.to_csv(self.target, index=False, header=self.header, encoding="utf-8")
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class _XlsxWriter:
+    # Write-only workbook: rows are streamed into the sheet XML as they
+    # come, and a full sheet continues on the next one.
+    def __init__(self, target, header=True):
+        from openpyxl import Workbook
+
+        self.target = target
+        self.wb = Workbook(write_only=True)
+        self.ws = None
+        self.columns = None
+
+    def _new_sheet(self):
+        self.ws = self.wb.create_sheet()
+        self.ws.append(self.columns)
+        self.rows = 1
+
+    def write(self, df):
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+        if self.ws is None:
+            self.columns = [str(c) for c in df.columns]
+            self._new_sheet()
+        values = df.astype(object).where(df.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if self.rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.ws.append([
+                ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row
+            ])
+            self.rows += 1
+
+    def close(self):
+        if self.ws is None:
+            self.wb.create_sheet()
+        self.wb.save(self.target)
+
+
+class _ParquetWriter:
+    # One row group per chunk. A chunk that happens to be all blank infers
+    # another type than its neighbours, so columns are written as text,
+    # as in the CSV export.
+    def __init__(self, target, header=True):
+        self.target = target
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(
+            df.astype("string").set_axis([str(c) for c in df.columns], axis=1),
+            preserve_index=False,
+        )
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.target, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "xlsx": _XlsxWriter, "parquet": _ParquetWriter}
+
+
+def open_writer(target, fmt: str, header: bool = True):
+    # Chunk-at-a-time table writer for a path or binary file: write(df) per
+    # chunk, close() at the end. header=False continues a CSV that already
+    # has one.
+    return _WRITERS[fmt](target, header)
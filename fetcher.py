@@ -0,0 +1,495 @@
+import asyncio
+import codecs
+import concurrent.futures
+import threading
+import time
+from collections import defaultdict, deque
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from bs4 import BeautifulSoup
+
+import metrics
+from classify import normalize
+from pagecache import canonical_url, conditional_headers
+
+MAX_CONCURRENT_REQUESTS = 32    # simultaneous URL fetches overall
+MAX_PER_HOST = 4                # simultaneous fetches against a single host
+REQUEST_TIMEOUT = 2             # seconds, for connecting and for each read
+MAX_PAGE_BYTES = 256 * 1024     # response bytes read per page; None parses the whole body
+BODY_TEXT_BUDGET = 32 * 1024    # characters of running body text kept per page
+STREAM_CHUNK = 16 * 1024
+PROGRESS_POLL = 0.2             # seconds between progress checks while waiting on a batch
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+_session = requests.Session()
+_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_REQUESTS))
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=MAX_CONCURRENT_REQUESTS))
+
+
+def is_fetchable(url: str) -> bool:
+    # A URL that does not parse (bad port, unclosed IPv6 bracket) yields no text.
+    if not url.lower().startswith(("http://", "https://")):
+        return False
+    return canonical_url(clean_url(url)) is not None
+
+
+def clean_url(url: str) -> str:
+    return url.strip().split("#")[0]
+
+
+def url_host(url: str) -> str:
+    try:
+        return (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+
+
+@metrics.timed("html_parse")
+def extract_text(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+    return normalize(soup.get_text())
+
+
+def extraction_variant(max_bytes) -> str:
+    # Page cache variant: capped extraction keeps different text than a
+    # full parse, so the two are stored under separate keys.
+    return "" if max_bytes is None else f"head-{max_bytes}-{BODY_TEXT_BUDGET}"
+
+
+def is_html(content_type) -> bool:
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in HTML_TYPES
+
+
+def _charset(content_type) -> str:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            try:
+                return codecs.lookup(value.strip().strip('"')).name
+            except LookupError:
+                break
+    return "utf-8"
+
+
+class PageTextExtractor(HTMLParser):
+    # Incremental extraction of the regions that carry most of the signal:
+    # title, meta descriptions, headings and the first BODY_TEXT_BUDGET
+    # characters of body text. Fed bytes as they arrive.
+    SKIP = {"script", "style", "noscript", "template"}
+    HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    META = {"description", "og:description", "og:title", "keywords"}
+
+    def __init__(self, content_type=None, body_budget: int = BODY_TEXT_BUDGET):
+        super().__init__(convert_charrefs=True)
+        self._decoder = codecs.getincrementaldecoder(_charset(content_type))(errors="replace")
+        self.body_budget = body_budget
+        self.title, self.meta, self.headings, self.body = [], [], [], []
+        self._body_len = 0
+        self._skip = 0
+        self._title = 0
+        self._heading = 0
+        self.parse_seconds = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self._body_len >= self.body_budget
+
+    def feed_bytes(self, chunk: bytes):
+        started = time.perf_counter()
+        self.feed(self._decoder.decode(chunk))
+        self.parse_seconds += time.perf_counter() - started
+
+    def _target(self):
+        if self._skip:
+            return None
+        if self._title:
+            return self.title
+        if self._heading:
+            return self.headings
+        if self._body_len < self.body_budget:
+            return self.body
+        return None
+
+    def _break(self):
+        # Text nodes may arrive split across feeds, so pieces are joined
+        # as-is and a space is only added at element boundaries.
+        target = self._target()
+        if target is not None:
+            target.append(" ")
+
+    def handle_starttag(self, tag, attrs):
+        self._break()
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag == "title":
+            self._title += 1
+        elif tag in self.HEADINGS:
+            self._heading += 1
+        elif tag == "meta":
+            attrs = dict(attrs)
+            name = (attrs.get("name") or attrs.get("property") or "").lower()
+            if name in self.META and attrs.get("content"):
+                self.meta.append(attrs["content"])
+
+    def handle_endtag(self, tag):
+        self._break()
+        if tag in self.SKIP:
+            self._skip = max(self._skip - 1, 0)
+        elif tag == "title":
+            self._title = max(self._title - 1, 0)
+        elif tag in self.HEADINGS:
+            self._heading = max(self._heading - 1, 0)
+
+    def handle_data(self, data):
+        target = self._target()
+        if target is not None:
+            target.append(data)
+            if target is self.body:
+                self._body_len += len(data)
+
+    def text(self) -> str:
+        started = time.perf_counter()
+        self.feed(self._decoder.decode(b"", final=True))
+        self.close()
+        regions = ("".join(self.title), " ".join(self.meta), "".join(self.headings), "".join(self.body))
+        text = normalize(" ".join(regions))
+        self.parse_seconds += time.perf_counter() - started
+        metrics.observe("html_parse", self.parse_seconds)
+        return text
+
+
+def _record_failure(e: Exception):
+    metrics.count("fetch_timeouts" if isinstance(e, (TimeoutError, requests.Timeout)) else "fetch_errors")
+
+
+@metrics.timed("fetch_domain_text")
+def fetch_domain_text(url: str, cache=None, max_bytes=MAX_PAGE_BYTES) -> str:
+    url = clean_url(url)
+    variant = extraction_variant(max_bytes)
+    entry = cache.lookup(url, variant) if cache else None
+    if entry is not None and entry.fresh:
+        cache.record("hits")
+        return entry.text
+
+    try:
+        r = _session.get(
+            url, headers=conditional_headers(entry), timeout=REQUEST_TIMEOUT,
+            stream=max_bytes is not None
+        )
+        with r:
+            if r.status_code == 304 and entry is not None:
+                cache.record("revalidated")
+                cache.refresh(url, variant)
+                return entry.text
+
+            content_type = r.headers.get("Content-Type")
+            if max_bytes is None:
+                metrics.count("fetch_bytes", len(r.content))
+                text = extract_text(r.text)
+            elif not is_html(content_type):
+                text = ""
+            else:
+                extractor, read = PageTextExtractor(content_type), 0
+                for chunk in r.iter_content(STREAM_CHUNK):
+                    extractor.feed_bytes(chunk)
+                    read += len(chunk)
+                    if read >= max_bytes or extractor.done:
+                        break
+                metrics.count("fetch_bytes", read)
+                text = extractor.text()
+    except Exception as e:
+        _record_failure(e)
+        # A stale copy beats nothing when the server cannot be reached.
+        return entry.text if entry is not None else ""
+
+    if cache:
+        cache.record("misses")
+        if r.ok:
+            cache.store(url, text, r.headers.get("ETag"), r.headers.get("Last-Modified"), variant)
+    return text
+
+
+@metrics.timed("safe_fetch")
+def safe_fetch(url: str, cache=None, max_bytes=MAX_PAGE_BYTES) -> str:
+    if not is_fetchable(url):
+        return ""
+    try:
+        return fetch_domain_text(url, cache, max_bytes)
+    except Exception:
+        return ""
+
+
+async def _fetch_one(session, url: str, cache=None, entry=None, max_bytes=MAX_PAGE_BYTES) -> str:
+    started = time.perf_counter()
+    try:
+        return await _fetch_page(session, url, cache, entry, max_bytes)
+    finally:
+        metrics.observe("fetch_page", time.perf_counter() - started)
+
+
+async def _fetch_page(session, url: str, cache, entry, max_bytes) -> str:
+    # Parsing and cache writes block, so they always run in a worker thread.
+    variant = extraction_variant(max_bytes)
+    try:
+        async with session.get(url, headers=conditional_headers(entry)) as r:
+            if r.status == 304 and entry is not None:
+                cache.record("revalidated")
+                await asyncio.to_thread(cache.refresh, url, variant)
+                return entry.text
+            ok, etag, last_modified = r.ok, r.headers.get("ETag"), r.headers.get("Last-Modified")
+
+            content_type = r.headers.get("Content-Type")
+            if max_bytes is None:
+                metrics.count("fetch_bytes", len(await r.read()))
+                html = await r.text(errors="replace")
+                text = await asyncio.to_thread(extract_text, html)
+            elif not is_html(content_type):
+                text = ""
+            else:
+                extractor, read = PageTextExtractor(content_type), 0
+                async for chunk in r.content.iter_chunked(STREAM_CHUNK):
+                    await asyncio.to_thread(extractor.feed_bytes, chunk)
+                    read += len(chunk)
+                    if read >= max_bytes or extractor.done:
+                        break
+                metrics.count("fetch_bytes", read)
+                text = await asyncio.to_thread(extractor.text)
+    except Exception as e:
+        _record_failure(e)
+        # A stale copy beats nothing when the server cannot be reached.
+        return entry.text if entry is not None else ""
+
+    if cache:
+        cache.record("misses")
+        if ok:
+            await asyncio.to_thread(cache.store, url, text, etag, last_modified, variant)
+    return text
+
+
+class FetchBatch:
+    # One submitted list of URLs; results[i] belongs to urls[i].
+    def __init__(self, urls, on_result=None):
+        self.urls = urls
+        self.results = [""] * len(urls)
+        self.remaining = len(urls)
+        self.on_result = on_result
+        self.future = concurrent.futures.Future()
+        if not urls:
+            self.future.set_result(self.results)
+
+    @property
+    def done_count(self) -> int:
+        return len(self.urls) - self.remaining
+
+    def deliver(self, i: int, text: str):
+        self.results[i] = text
+        self.remaining -= 1
+        if self.on_result:
+            self.on_result(i, text)
+        if self.remaining == 0:
+            self.future.set_result(self.results)
+
+    def wait(self, on_progress=None, interval: float = PROGRESS_POLL) -> list:
+        # Blocks until every URL is answered; on_progress(n) is told how many
+        # more rows finished, from the calling thread.
+        reported = 0
+        while True:
+            try:
+                results = self.future.result(timeout=interval)
+            except concurrent.futures.TimeoutError:
+                results = None
+            done = self.done_count if results is None else len(self.urls)
+            if on_progress and done > reported:
+                on_progress(done - reported)
+                reported = done
+            if results is not None:
+                return results
+
+
+async def _schedule(inbox, concurrency: int, per_host: int, cache, max_bytes):
+    # Fetches the URLs of every FetchBatch put on inbox until a None arrives.
+    # Batches share one set of per-host queues, so a batch submitted while
+    # another is in flight starts at once instead of waiting for its tail.
+    variant = extraction_variant(max_bytes)
+    waiters = {}            # url -> [(batch, row)] for URLs queued or in flight
+    stale = {}
+    pending = defaultdict(deque)
+    hosts = deque()         # hosts with queued URLs
+    active = defaultdict(int)
+    running = {}
+    batches = set()
+
+    def deliver(url, text):
+        for batch, i in waiters.pop(url):
+            batch.deliver(i, text)
+            if batch.remaining == 0:
+                batches.discard(batch)
+
+    async def admit(batch):
+        batches.add(batch)
+        # Duplicate URLs are fetched once; every row that asked for one gets the text.
+        new_urls = []
+        for i, url in enumerate(batch.urls):
+            if not is_fetchable(url):
+                batch.deliver(i, "")
+                continue
+            url = clean_url(url)
+            if url not in waiters:
+                waiters[url] = []
+                new_urls.append(url)
+            waiters[url].append((batch, i))
+        if batch.remaining == 0:
+            batches.discard(batch)
+
+        # Fresh cache hits never reach the scheduler; stale ones are revalidated.
+        # The lookups are one batch of SQLite reads, kept off the event loop.
+        entries = {}
+        if cache:
+            entries = await asyncio.to_thread(
+                lambda: {url: cache.lookup(url, variant) for url in new_urls}
+            )
+        for url in new_urls:
+            entry = entries.get(url)
+            if entry is not None and entry.fresh:
+                cache.record("hits")
+                deliver(url, entry.text)
+                continue
+            stale[url] = entry
+            host = url_host(url)
+            if not pending[host]:
+                hosts.append(host)
+            pending[host].append(url)
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+
+    getter, closing = None, False
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while True:
+                # Round-robin over hosts with free slots, so one busy host never
+                # holds up the others and no batch waits for its slowest URL.
+                skipped = 0
+                while hosts and len(running) < concurrency and skipped < len(hosts):
+                    host = hosts.popleft()
+                    if active[host] < per_host:
+                        url = pending[host].popleft()
+                        task = asyncio.create_task(
+                            _fetch_one(session, url, cache, stale.pop(url), max_bytes)
+                        )
+                        running[task] = (host, url)
+                        active[host] += 1
+                        skipped = 0
+                    else:
+                        skipped += 1
+                    if pending[host]:
+                        hosts.append(host)
+
+                if closing and not running and not hosts:
+                    break
+                if getter is None and not closing:
+                    getter = asyncio.create_task(inbox.get())
+
+                waiting = set(running) | ({getter} if getter else set())
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is getter:
+                        getter = None
+                        batch = task.result()
+                        if batch is None:
+                            closing = True
+                        else:
+                            await admit(batch)
+                        continue
+                    host, url = running.pop(task)
+                    active[host] -= 1
+                    deliver(url, task.result())
+    except BaseException as e:
+        for batch in batches:
+            if not batch.future.done():
+                batch.future.set_exception(e)
+        raise
+    finally:
+        if getter is not None:
+            getter.cancel()
+
+    if cache:
+        await asyncio.to_thread(cache.evict)
+
+
+async def _fetch_all(urls, on_result, concurrency: int, per_host: int, cache, max_bytes):
+    batch = FetchBatch(urls, on_result)
+    inbox = asyncio.Queue()
+    inbox.put_nowait(batch)
+    inbox.put_nowait(None)
+    await _schedule(inbox, concurrency, per_host, cache, max_bytes)
+    return batch.results
+
+
+def fetch_texts(urls, on_result=None, concurrency: int = MAX_CONCURRENT_REQUESTS,
+                per_host: int = MAX_PER_HOST, cache=None, max_bytes=MAX_PAGE_BYTES) -> list:
+    return asyncio.run(
+        _fetch_all(list(urls), on_result, concurrency, per_host, cache, max_bytes)
+    )
+
+
+class FetchStream:
+    # A long-lived fetch engine on its own event-loop thread. Batches can be
+    # submitted at any time (e.g. one per spreadsheet chunk) and all of them
+    # feed the same scheduler, so there is no barrier between batches.
+    def __init__(self, concurrency: int = MAX_CONCURRENT_REQUESTS, per_host: int = MAX_PER_HOST,
+                 cache=None, max_bytes=MAX_PAGE_BYTES):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._inbox = None
+
+        async def start():
+            self._inbox = asyncio.Queue()
+            return asyncio.ensure_future(
+                _schedule(self._inbox, concurrency, per_host, cache, max_bytes)
+            )
+
+        self._runner = asyncio.run_coroutine_threadsafe(start(), self._loop).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, urls) -> FetchBatch:
+        batch = FetchBatch(list(urls))
+        self._loop.call_soon_threadsafe(self._inbox.put_nowait, batch)
+        return batch
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._inbox.put_nowait, None)
+        try:
+            asyncio.run_coroutine_threadsafe(asyncio.wait([self._runner]), self._loop).result()
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+
+def prefetch(items, submit, depth: int = 1):
+    # Yields (item, submit(item)) with `depth` items submitted ahead, so work
+    # for the next item is already queued while the caller handles this one.
+    ahead = deque()
+    for item in items:
+        ahead.append((item, submit(item)))
+        if len(ahead) > depth:
+            yield ahead.popleft()
+    while ahead:
+        yield ahead.popleft()
@@ -0,0 +1,94 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from archive import iter_chunks, source_size
+
+BLOCK_SIZE = 64 * 1024                  # bytes hashed at each end for the partial stage
+HASH_WORKERS = os.cpu_count() or 4      # hashlib and file reads release the GIL
+
+
+def content_size(source) -> int:
+    size = source_size(source)
+    if size is None:
+        size = source.seek(0, os.SEEK_END)
+        source.seek(0)
+    return size
+
+
+def _read_at(source, offset: int, length: int) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[offset:offset + length])
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+    source.seek(offset)
+    return source.read(length)
+
+
+def full_hash(source) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for chunk in iter_chunks(source):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def partial_hash(source, size: int, block_size: int = BLOCK_SIZE) -> str:
+    # Small files are hashed whole, so the full stage can skip them.
+    if size <= 2 * block_size:
+        return full_hash(source)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(_read_at(source, 0, block_size))
+    h.update(_read_at(source, size - block_size, block_size))
+    return h.hexdigest()
+
+
+def _stage_size(member):
+    return member[2]
+
+
+def _stage_partial(member):
+    return partial_hash(member[1], member[2])
+
+
+def _stage_full(member):
+    if member[2] <= 2 * BLOCK_SIZE:
+        return ""
+    return full_hash(member[1])
+
+
+def _split(groups, stage, mapper):
+    flat = [(gi, m) for gi, group in enumerate(groups) for m in group]
+    values = mapper(stage, [m for _, m in flat])
+
+    buckets = {}
+    for (gi, member), value in zip(flat, values):
+        buckets.setdefault((gi, value), []).append(member)
+    return [b for b in buckets.values() if len(b) > 1]
+
+
+def identical_groups(groups, workers=None, keep=None):
+    # groups: lists of (key, source) that may share content.
+    # Each stage only reads the members that survived the previous one.
+    # keep(keys, size), when given, drops groups that could not be wanted
+    # anyway, before any of their content is read.
+    def kept(groups):
+        if keep is None:
+            return groups
+        return [g for g in groups if keep([m[0] for m in g], g[0][2])]
+
+    groups = [
+        [(key, source, content_size(source)) for key, source in group]
+        for group in groups
+        if len(group) > 1
+    ]
+    groups = kept(_split(groups, _stage_size, map))
+
+    with ThreadPoolExecutor(max_workers=workers or HASH_WORKERS) as pool:
+        for stage in (_stage_partial, _stage_full):
+            if not groups:
+                break
+            groups = kept(_split(groups, stage, pool.map))
+
+    return [[(key, source) for key, source, _ in group] for group in groups]
@@ -0,0 +1,166 @@
+import re
+
+import numpy as np
+
+from diff import normalize
+
+NGRAM = 3
+MIN_SIMILARITY = 0.6            # Dice coefficient of trigram sets
+BANDS = 24                      # LSH bands; a candidate must agree on a whole band
+BAND_ROWS = 4                   # MinHash values per band
+BUCKET_CAP = 8                  # reference names taken from one bucket per query
+VERIFY_TOP = 6                  # candidates per query scored exactly, most band votes first
+QUERY_BATCH = 8192              # queries resolved per vectorized pass
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def name_key(filename: str) -> str:
+    # diff.normalize, with every run of separators folded to one space, so
+    # report_v2_final and report-v2-final share a key.
+    return _SEPARATORS.sub(" ", normalize(filename)).strip()
+
+
+def ngrams(key: str, n: int = NGRAM) -> frozenset:
+    padded = f" {key} "
+    return frozenset(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a or b else 0.0
+
+
+_rng = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _rng.integers(1, 2**63, BANDS * BAND_ROWS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2**63, BANDS * BAND_ROWS, dtype=np.uint64)
+
+
+def _gram_code(gram: str) -> int:
+    # Stable across processes, unlike hash(); exact for trigrams.
+    code = 0
+    for ch in gram:
+        code = (code * 0x110000 + ord(ch)) & 0x7FFFFFFFFFFFFFFF
+    return code
+
+
+def _signatures(gram_sets) -> np.ndarray:
+    # One MinHash value per (name, hash function), computed column-wise over
+    # the flattened trigrams of every name at once.
+    codes = {g: _gram_code(g) for g in set().union(*gram_sets)}
+    lengths = np.fromiter(map(len, gram_sets), dtype=np.int64, count=len(gram_sets))
+    flat = np.fromiter(
+        (codes[g] for grams in gram_sets for g in grams), dtype=np.int64, count=int(lengths.sum())
+    ).view(np.uint64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    sig = np.empty((len(gram_sets), BANDS * BAND_ROWS), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for j in range(sig.shape[1]):
+            h = flat * _MULTIPLIERS[j] + _OFFSETS[j]
+            h ^= h >> np.uint64(31)
+            sig[:, j] = np.minimum.reduceat(h, starts)
+    return sig
+
+
+def _band_keys(sig, band: int) -> np.ndarray:
+    cols = sig[:, band * BAND_ROWS:(band + 1) * BAND_ROWS]
+    key = cols[:, 0].copy()
+    with np.errstate(over="ignore"):
+        for c in range(1, BAND_ROWS):
+            key = (key * np.uint64(0x9E3779B97F4A7C15)) ^ cols[:, c]
+    return key
+
+
+class NameIndex:
+    # MinHash/LSH index over reference filenames. Names that agree on all
+    # rows of at least one band become candidates; each bucket contributes
+    # at most BUCKET_CAP of them, candidates are ranked by how many bands
+    # they agree on and only the top VERIFY_TOP are scored exactly, so a
+    # query costs the same however many similar names the index holds.
+    # Identical keys (separator or extension differences) are answered
+    # directly with a similarity of 1.
+    def __init__(self, names, min_similarity: float = MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self.names = list(names)
+        self._grams = [ngrams(name_key(name)) for name in self.names]
+        self._exact = {}
+        for i, name in enumerate(self.names):
+            self._exact.setdefault(name_key(name), i)
+
+        self._bands = []
+        if self.names:
+            sig = _signatures(self._grams)
+            for b in range(BANDS):
+                keys = _band_keys(sig, b)
+                order = np.argsort(keys, kind="stable")
+                self._bands.append((keys[order], order))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, query_grams):
+        # (query row, reference id) pairs, best-voted first within each query.
+        sig = _signatures(query_grams)
+        rows, refs = [], []
+        for b, (sorted_keys, order) in enumerate(self._bands):
+            keys = _band_keys(sig, b)
+            lo = np.searchsorted(sorted_keys, keys, side="left")
+            count = np.minimum(np.searchsorted(sorted_keys, keys, side="right") - lo, BUCKET_CAP)
+            total = int(count.sum())
+            if not total:
+                continue
+            q = np.repeat(np.arange(len(keys)), count)
+            offset = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+            rows.append(q)
+            refs.append(order[np.repeat(lo, count) + offset])
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        codes, votes = np.unique(
+            np.concatenate(rows) * len(self.names) + np.concatenate(refs), return_counts=True
+        )
+        q, r = codes // len(self.names), codes % len(self.names)
+        ranked = np.lexsort((r, -votes, q))
+        q, r = q[ranked], r[ranked]
+        first = np.searchsorted(q, q, side="left")
+        keep = np.arange(len(q)) - first < VERIFY_TOP
+        return q[keep], r[keep]
+
+    def best_matches(self, filenames) -> list:
+        # (best reference name or None, similarity) for each filename.
+        filenames = list(filenames)
+        results = [(None, 0.0)] * len(filenames)
+        pending = []
+        for i, filename in enumerate(filenames):
+            hit = self._exact.get(name_key(filename))
+            if hit is not None:
+                results[i] = (self.names[hit], 1.0)
+            elif self._bands:
+                pending.append(i)
+
+        for start in range(0, len(pending), QUERY_BATCH):
+            batch = pending[start:start + QUERY_BATCH]
+            grams = [ngrams(name_key(filenames[i])) for i in batch]
+            best = {}
+            for q, r in zip(*(a.tolist() for a in self._candidates(grams))):
+                score = similarity(grams[q], self._grams[r])
+                if score >= self.min_similarity and (
+                    q not in best or score > best[q][1] or (score == best[q][1] and r < best[q][0])
+                ):
+                    best[q] = (r, score)
+            for q, (r, score) in best.items():
+                results[batch[q]] = (self.names[r], score)
+        return results
+
+    def best_match(self, filename: str):
+        return self.best_matches([filename])[0]
+
+
+def near_misses(names, reference_names, min_similarity: float = MIN_SIMILARITY) -> list:
+    # (name, best reference match or None, similarity) for each name.
+    if isinstance(reference_names, NameIndex):
+        index = reference_names
+    else:
+        index = NameIndex(reference_names, min_similarity)
+    names = list(names)
+    return [(name, *match) for name, match in zip(names, index.best_matches(names))]
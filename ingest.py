@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+INGEST_CHUNK_ROWS = 5_000       # rows per yielded DataFrame
+TABLE_TYPES = ["xlsx", "csv", "parquet"]
+
+
+def table_format(source, name=None) -> str:
+    name = name or getattr(source, "name", None) or os.fspath(source)
+    ext = str(name).rsplit(".", 1)[-1].lower()
+    if ext not in TABLE_TYPES:
+        raise ValueError(f"Unsupported table format: {name}")
+    return ext
+
+
+def _rewind(source):
+    # Uploaded files survive Streamlit reruns, so their cursor may sit at EOF.
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _header_names(values):
+    # Same labels pd.read_excel gives blank and repeated headers.
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _check_width(columns, width):
+    if columns and max(columns) >= width:
+        raise ValueError(f"Table must contain at least {max(columns) + 1} columns.")
+
+
+def _iter_xlsx(source, columns, chunk_rows):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(_rewind(source), read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        _check_width(columns, len(header))
+        picks = columns if columns is not None else range(len(header))
+        names = [_header_names(header)[i] for i in picks]
+
+        # Blank rows are held back until a non-blank one follows, so trailing
+        # padding is dropped the way pd.read_excel drops it.
+        chunk, blanks = [], 0
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in picks]
+            if all(v is None for v in values):
+                blanks += 1
+                continue
+            chunk.extend([[np.nan] * len(picks)] * blanks)
+            blanks = 0
+            chunk.append([np.nan if v is None else v for v in values])
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=names)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=names)
+    finally:
+        wb.close()
+
+
+def _iter_csv(source, columns, chunk_rows):
+    header = pd.read_csv(_rewind(source), nrows=0).columns
+    if columns is not None:
+        _check_width(columns, len(header))
+    reader = pd.read_csv(_rewind(source), usecols=columns, chunksize=chunk_rows)
+    with reader:
+        for chunk in reader:
+            yield chunk if columns is None else chunk[[header[i] for i in columns]]
+
+
+def _iter_parquet(source, columns, chunk_rows):
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(_rewind(source))
+    names = pf.schema_arrow.names
+    if columns is not None:
+        _check_width(columns, len(names))
+        names = [names[i] for i in columns]
+    for batch in pf.iter_batches(batch_size=chunk_rows, columns=names):
+        yield batch.to_pandas()
+
+
+_READERS = {"xlsx": _iter_xlsx, "csv": _iter_csv, "parquet": _iter_parquet}
+
+
+def iter_table(source, columns=None, chunk_rows: int = INGEST_CHUNK_ROWS, name=None):
+    # DataFrames of at most chunk_rows rows, holding only the columns at the
+    # given positions (all of them when None), first row as header.
+    return _READERS[table_format(source, name)](source, columns, chunk_rows)
+
+
+def read_table(source, columns=None, name=None) -> pd.DataFrame:
+    chunks = list(iter_table(source, columns, name=name))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def table_rows(source, name=None):
+    # Data rows when the format records them up front, else None.
+    fmt = table_format(source, name)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(_rewind(source)).metadata.num_rows
+    if fmt == "xlsx":
+        from openpyxl import load_workbook
+        wb = load_workbook(_rewind(source), read_only=True)
+        try:
+            max_row = wb.worksheets[0].max_row
+        finally:
+            wb.close()
+        return max_row - 1 if max_row else None
+    return None
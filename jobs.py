@@ -0,0 +1,268 @@
+import bisect
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from itertools import accumulate, chain
+
+from archive import iter_chunks
+from export import open_writer
+
+JOBS_DIR = os.environ.get("PORTICUS_JOBS", "classify_jobs")
+STATE_INTERVAL = 1.0            # seconds between progress writes within a chunk
+JOB_MAX_AGE = 7 * 24 * 3600     # seconds a finished job's files are kept
+UNSUPPORTED = "Unsupported language"
+
+_running = {}                   # job id -> (job, thread) started in this process
+_lock = threading.Lock()
+
+
+def job_id(source, options: dict) -> str:
+    # Same bytes and options, same job: a re-upload after a refresh or a
+    # server restart finds the existing checkpoints.
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode())
+    for chunk in iter_chunks(source):
+        digest.update(chunk)
+    return digest.hexdigest()[:20]
+
+
+class ClassifyJob:
+    # A Classificatio run kept on disk under root/<id>: a copy of the input,
+    # state.json, one pickled part per classified chunk and result.csv,
+    # which grows with the parts. Parts and CSV rows are written before the
+    # state that counts them, so a job stopped at any point resumes after
+    # its last complete part.
+    def __init__(self, path: str):
+        self.path = path
+        self.id = os.path.basename(path)
+        self._stop = threading.Event()
+        self._written = 0.0
+
+    @classmethod
+    def create(cls, source, name: str, use_web: bool = False, root: str = JOBS_DIR):
+        options = {"use_web": use_web}
+        job = cls(os.path.join(root, job_id(source, options)))
+        if os.path.exists(job._state_path):
+            return job
+
+        os.makedirs(job.path, exist_ok=True)
+        ext = name.rsplit(".", 1)[-1].lower()
+        with open(job.input_path(ext), "wb") as f:
+            for chunk in iter_chunks(source):
+                f.write(chunk)
+        job._write_state({
+            "name": name, "ext": ext, **options, "status": "queued", "error": None,
+            "total": None, "rows_done": 0, "rows_seen": 0, "parts": 0, "part_rows": [], "csv_bytes": 0,
+            "lang": None, "family": None, "family_counts": {}, "cache_stats": None,
+            "created": time.time(),
+        })
+        return job
+
+    @property
+    def _state_path(self):
+        return os.path.join(self.path, "state.json")
+
+    def input_path(self, ext: str) -> str:
+        return os.path.join(self.path, f"input.{ext}")
+
+    def part_path(self, n: int) -> str:
+        return os.path.join(self.path, f"part-{n:06d}.pkl")
+
+    def export_path(self, fmt: str) -> str:
+        return os.path.join(self.path, f"result.{fmt}")
+
+    def state(self) -> dict:
+        with open(self._state_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_state(self, state: dict):
+        state["updated"] = time.time()
+        tmp = f"{self._state_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._state_path)
+
+    def result(self):
+        import pandas as pd
+
+        parts = [pd.read_pickle(self.part_path(n)) for n in range(self.state()["parts"])]
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+    def rows(self, start: int, stop: int):
+        # Result rows [start, stop), read from the parts that hold them only.
+        import pandas as pd
+
+        ends = list(accumulate(self.state()["part_rows"]))
+        first = bisect.bisect_right(ends, start)
+        last = bisect.bisect_left(ends, stop)
+        offset = ends[first - 1] if first else 0
+        parts = [pd.read_pickle(self.part_path(n)) for n in range(first, min(last + 1, len(ends)))]
+        if not parts:
+            return pd.DataFrame()
+        page = pd.concat(parts, ignore_index=True).iloc[start - offset:stop - offset]
+        return page.set_axis(range(start, start + len(page)))
+
+    def export(self, fmt: str) -> str:
+        # Path of the finished results as CSV, XLSX or Parquet. The CSV is
+        # kept up to date while the job runs; other formats are streamed
+        # from the parts one chunk at a time, once per job.
+        import pandas as pd
+
+        path = self.export_path(fmt)
+        if fmt == "csv" or os.path.exists(path):
+            return path
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            writer = open_writer(f, fmt)
+            for n in range(self.state()["parts"]):
+                writer.write(pd.read_pickle(self.part_path(n)))
+            writer.close()
+        os.replace(tmp, path)
+        return path
+
+    def run(self, pool=None):
+        state = self.state()
+        state.update(status="running", error=None, rows_seen=state["rows_done"])
+        self._write_state(state)
+        try:
+            self._classify(state, pool)
+        except Exception as e:
+            state.update(status="failed", error=str(e))
+        else:
+            state["status"] = "stopped" if self._stop.is_set() else "done"
+        state["rows_seen"] = state["rows_done"]
+        self._write_state(state)
+
+    def _classify(self, state: dict, pool):
+        from classify import classify_frames
+        from fetcher import FetchStream, prefetch
+        from ingest import iter_table, table_rows
+        from keywords import KEYWORDS_BY_FAMILY, LANGUAGE_TO_FAMILY
+        from language import detect_document_language
+
+        source = self.input_path(state["ext"])
+        if state["total"] is None:
+            state["total"] = table_rows(source)
+        chunks = iter_table(source, columns=[0, 2, 3])
+        first = next(chunks, None)
+        if first is None:
+            raise ValueError("The file contains no rows.")
+        col_a, col_c, col_d = first.columns
+        if state["lang"] is None:
+            state["lang"] = detect_document_language(first, [col_a, col_c])
+            state["family"] = LANGUAGE_TO_FAMILY.get(state["lang"])
+
+        # Chunks covered by a checkpoint are parsed but never fetched or
+        # classified again.
+        done = state["parts"]
+        todo = (df for n, df in enumerate(chain([first], chunks)) if n >= done)
+
+        cache = stream = None
+        if state["use_web"]:
+            from pagecache import PageCache
+            cache = PageCache()
+            stream = FetchStream(cache=cache)
+
+        def progress(n):
+            state["rows_seen"] += n
+            if time.monotonic() - self._written >= STATE_INTERVAL:
+                self._written = time.monotonic()
+                self._write_state(state)
+
+        def submit(df):
+            if stream is None:
+                return None
+            return stream.submit(df[col_d].astype(str).str.strip().tolist())
+
+        def frames():
+            for df, batch in prefetch(todo, submit):
+                if self._stop.is_set():
+                    return
+                web_texts = batch.wait(on_progress=progress) if batch is not None else None
+                yield df, [col_a, col_c], state["family"], web_texts
+
+        # Whatever a stopped run appended past its last checkpoint is cut off.
+        out = open(self.export_path("csv"), "ab")
+        out.truncate(state["csv_bytes"])
+        out.seek(state["csv_bytes"])
+        csv = open_writer(out, "csv", header=state["csv_bytes"] == 0)
+        try:
+            if pool is not None:
+                classified = pool.classify_frames(frames())
+            else:
+                classified = classify_frames(frames(), KEYWORDS_BY_FAMILY, unsupported=UNSUPPORTED)
+            for df, families in classified:
+                result = df[[col_a, col_c, col_d, "Sector"]]
+                result.to_pickle(self.part_path(state["parts"]))
+                csv.write(result)
+                out.flush()
+                counts = state["family_counts"]
+                for f in families:
+                    if f:
+                        counts[f] = counts.get(f, 0) + 1
+                state["parts"] += 1
+                state["part_rows"].append(len(df))
+                state["csv_bytes"] = out.tell()
+                state["rows_done"] += len(df)
+                state["rows_seen"] = state["rows_done"]
+                if cache is not None:
+                    state["cache_stats"] = dict(cache.stats)
+                self._written = time.monotonic()
+                self._write_state(state)
+        finally:
+            out.close()
+            if stream is not None:
+                stream.close()
+            if cache is not None:
+                cache.close()
+
+
+def is_running(job_id: str) -> bool:
+    with _lock:
+        entry = _running.get(job_id)
+        return entry is not None and entry[1].is_alive()
+
+
+def start(job: ClassifyJob, pool=None) -> bool:
+    # Runs the job on a background thread unless it is finished or already
+    # running here. A job left "running" by a process that went away is
+    # simply started again and resumes from its checkpoints.
+    with _lock:
+        entry = _running.get(job.id)
+        if entry is not None and entry[1].is_alive():
+            return False
+        if job.state()["status"] == "done":
+            return False
+        job._stop.clear()
+        thread = threading.Thread(target=job.run, args=(pool,), name=f"classify-{job.id}", daemon=True)
+        _running[job.id] = (job, thread)
+        thread.start()
+        return True
+
+
+def stop(job_id: str):
+    # Asks a running job to stop after its current chunk; it keeps its
+    # checkpoints and can be started again.
+    with _lock:
+        entry = _running.get(job_id)
+    if entry is not None:
+        entry[0]._stop.set()
+
+
+def prune(root: str = JOBS_DIR, max_age: float = JOB_MAX_AGE):
+    # Drops job directories untouched for max_age seconds.
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(root):
+        state = os.path.join(entry.path, "state.json")
+        try:
+            stale = os.path.getmtime(state if os.path.exists(state) else entry.path) < cutoff
+        except OSError:
+            continue
+        if stale:
+            if is_running(entry.name):
+                continue
+            shutil.rmtree(entry.path, ignore_errors=True)
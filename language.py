@@ -0,0 +1,111 @@
+import re
+from functools import lru_cache
+
+from langdetect import DetectorFactory, detect
+
+import metrics
+from classify import normalize
+from keywords import LANGUAGE_TO_FAMILY
+
+DetectorFactory.seed = 0
+
+MIN_ROUTE_LETTERS = 12          # shorter rows inherit the document's family
+STOPWORD_MIN_HITS = 2
+STOPWORD_MARGIN = 2.0           # best family needs this many times the runner-up's hits
+DETECT_CACHE_SIZE = 100_000
+
+# Letters used by only one supported family.
+FAMILY_CHARS = {
+    "germanic": "ßåæøþð",
+    "romance": "ñãçșțăêôû",
+    "slavic": "ąęłśźżńćřůěďťňľĺŕđ",
+    "baltic": "ėįųūāēīķļņģ",
+    "celtic": "ŵŷ",
+    "uralic": "őű",
+}
+_CHAR_FAMILY = {ch: family for family, chars in FAMILY_CHARS.items() for ch in chars}
+
+STOPWORDS = {
+    "germanic": {
+        "the", "and", "of", "to", "is", "for", "with", "your", "our", "are",
+        "der", "die", "das", "und", "ist", "mit", "für", "von", "zu", "den",
+        "het", "een", "voor", "met", "och", "att", "som", "för", "og", "til", "af",
+    },
+    "romance": {
+        "el", "la", "los", "las", "del", "y", "para", "con", "por", "una",
+        "le", "les", "des", "du", "et", "pour", "avec", "dans", "sur", "est",
+        "il", "gli", "della", "di", "per", "che", "os", "da", "do", "das", "dos",
+        "com", "em", "și", "în", "pentru", "cu", "din", "este",
+    },
+    "slavic": {
+        "w", "z", "dla", "się", "jest", "nie", "oraz", "v", "je", "se", "pro",
+        "ve", "jsou", "sú", "za", "od", "su",
+    },
+    "baltic": {
+        "ir", "yra", "kad", "į", "iš", "apie", "un", "ar", "par", "uz", "kas",
+    },
+    "celtic": {
+        "agus", "an", "na", "ar", "le", "don", "yr", "ac", "yn", "ei", "air", "gu",
+    },
+    "uralic": {
+        "ja", "on", "ei", "että", "tai", "kanssa", "mukaan", "see", "või", "kui",
+        "az", "és", "egy", "hogy", "nem", "van", "meg",
+    },
+}
+
+_CYRILLIC = re.compile(r"[Ѐ-ӿ]")
+_LETTERS = re.compile(r"[^\W\d_]")
+
+
+@metrics.timed("detect_document_language")
+def detect_document_language(df, columns):
+    try:
+        sample = " ".join(df[columns].astype(str).head(20).values.flatten())
+        return detect(sample)
+    except Exception:
+        return "en"  # safe default
+
+
+@lru_cache(maxsize=DETECT_CACHE_SIZE)
+def _detect_family(text: str):
+    try:
+        return LANGUAGE_TO_FAMILY.get(detect(text))
+    except Exception:
+        return None
+
+
+def _fast_family(text: str):
+    # Cheap checks, most decisive first; None means "ask langdetect".
+    if _CYRILLIC.search(text):
+        return "slavic"
+
+    char_families = {_CHAR_FAMILY[ch] for ch in set(text) if ch in _CHAR_FAMILY}
+    if len(char_families) == 1:
+        return char_families.pop()
+
+    words = set(normalize(text).split())
+    hits = sorted(
+        ((len(words & stopwords), family) for family, stopwords in STOPWORDS.items()),
+        reverse=True
+    )
+    (best, family), (runner_up, _) = hits[0], hits[1]
+    if best >= STOPWORD_MIN_HITS and best >= STOPWORD_MARGIN * runner_up:
+        return family
+    return None
+
+
+@metrics.timed("route_families")
+def route_families(texts, default=None) -> list:
+    # Each distinct row text is routed once; langdetect only sees the rows
+    # the fast checks could not settle, and its answers are memoized.
+    routed = {}
+    for text in texts:
+        key = " ".join(str(text).lower().split())
+        if key in routed:
+            continue
+        if len(_LETTERS.findall(key)) < MIN_ROUTE_LETTERS:
+            routed[key] = default
+        else:
+            routed[key] = _fast_family(key) or _detect_family(key) or default
+
+    return [routed[" ".join(str(text).lower().split())] for text in texts]
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import time
+
+from archive import source_size
+from diff import normalize
+
+DEFAULT_MANIFEST_PATH = os.environ.get("PORTICUS_MANIFEST", "delivery_manifest.sqlite3")
+INSERT_BATCH = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT NOT NULL UNIQUE,
+    committed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT NOT NULL,
+    round_id INTEGER NOT NULL REFERENCES rounds(id),
+    filename TEXT NOT NULL,
+    size INTEGER,
+    PRIMARY KEY (name, round_id)
+) WITHOUT ROWID;
+"""
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DeliveryManifest:
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def rounds(self):
+        return self.conn.execute(
+            "SELECT r.id, r.label, r.committed_at, COUNT(f.name) "
+            "FROM rounds r LEFT JOIN files f ON f.round_id = r.id "
+            "GROUP BY r.id ORDER BY r.id"
+        ).fetchall()
+
+    def commit_round(self, label: str, files) -> int:
+        # files: iterable of filenames, or a mapping of filename -> data.
+        if hasattr(files, "items"):
+            rows = ((normalize(n), n, source_size(d)) for n, d in files.items())
+        else:
+            rows = ((normalize(n), n, None) for n in files)
+
+        with self.conn:
+            try:
+                round_id = self.conn.execute(
+                    "INSERT INTO rounds (label, committed_at) VALUES (?, ?)",
+                    (label, time.time())
+                ).lastrowid
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Delivery round already recorded: {label}")
+
+            for batch in _batched(rows, INSERT_BATCH):
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO files (name, round_id, filename, size) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(name, round_id, filename, size) for name, filename, size in batch]
+                )
+        return round_id
+
+    def _round_filter(self, rounds):
+        if rounds is None:
+            return "", []
+        rounds = list(rounds)
+        placeholders = ", ".join("?" * len(rounds)) or "NULL"
+        return f" AND f.round_id IN ({placeholders})", rounds
+
+    def filenames(self, rounds=None):
+        # Delivered filenames as recorded, one per name.
+        clause, params = self._round_filter(rounds)
+        for (filename,) in self.conn.execute(
+            f"SELECT MIN(f.filename) FROM files f WHERE 1{clause} GROUP BY f.name", params
+        ):
+            yield filename
+
+    def name_index(self, rounds=None, path=None):
+        # Delivered names of the given rounds as a DeliveredIndex, streamed
+        # out of the database; diff.find_new_files takes it in place of a
+        # name list.
+        from nameindex import DeliveredIndex
+
+        clause, params = self._round_filter(rounds)
+        cursor = self.conn.execute(f"SELECT DISTINCT f.name FROM files f WHERE 1{clause}", params)
+        return DeliveredIndex.build((name for (name,) in cursor), path=path)
+
+    def find_new_files(self, postprocessed_files, rounds=None):
+        # Same contract as diff.find_new_files, with the delivery side read
+        # from the recorded rounds (all of them when rounds is None).
+        clause, params = self._round_filter(rounds)
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS candidates (name TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM candidates")
+            for batch in _batched(postprocessed_files, INSERT_BATCH):
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO candidates (name) VALUES (?)",
+                    [(normalize(filename),) for filename in batch]
+                )
+            delivered = {
+                name for (name,) in self.conn.execute(
+                    "SELECT c.name FROM candidates c WHERE EXISTS ("
+                    f"SELECT 1 FROM files f WHERE f.name = c.name{clause})",
+                    params
+                )
+            }
+            self.conn.execute("DELETE FROM candidates")
+
+        return [
+            (filename, data)
+            for filename, data in postprocessed_files.items()
+            if normalize(filename) not in delivered
+        ]
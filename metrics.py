@@ -0,0 +1,172 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)   # seconds
+PREFIX = "porticus"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)     # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-th observation.
+        rank, seen = q * self.count, 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    # Process-wide stage timings and counters. Everything is a no-op while
+    # disabled; the cost is then one attribute check per call.
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = _Histogram()
+            hist.observe(seconds)
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "seconds": h.sum,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], h.counts)),
+                }
+                for stage, h in sorted(self.stages.items())
+            }
+            counters = dict(sorted(self.counters.items()))
+        lookups = sum(counters.get(f"page_cache_{k}", 0) for k in ("hits", "revalidated", "misses"))
+        if lookups:
+            served = counters.get("page_cache_hits", 0) + counters.get("page_cache_revalidated", 0)
+            counters["page_cache_hit_rate"] = served / lookups
+        return {"stages": stages, "counters": counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            stages = {stage: (list(h.counts), h.count, h.sum) for stage, h in sorted(self.stages.items())}
+            counters = dict(sorted(self.counters.items()))
+
+        lines = []
+        if stages:
+            name = f"{PREFIX}_stage_seconds"
+            lines += [f"# HELP {name} Time spent per pipeline stage.", f"# TYPE {name} histogram"]
+            for stage, (counts, count, total) in stages.items():
+                cumulative = 0
+                for bound, n in zip([*map(str, LATENCY_BUCKETS), "+Inf"], counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        for counter, value in counters.items():
+            name = f"{PREFIX}_{counter}_total"
+            lines += [f"# TYPE {name} counter", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        # .prom files get the Prometheus text format (node_exporter textfile
+        # collector), anything else JSON. Replaced atomically so a collector
+        # never reads half a file.
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+registry = Metrics(enabled=os.environ.get("PORTICUS_METRICS", "") not in ("", "0"))
+
+
+def enable(on: bool = True):
+    registry.enabled = on
+
+
+def observe(stage: str, seconds: float):
+    registry.observe(stage, seconds)
+
+
+def count(name: str, n: int = 1):
+    registry.count(name, n)
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.stage, time.perf_counter() - self.start)
+
+
+class _NoTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timer(stage: str):
+    return _Timer(stage) if registry.enabled else _NO_TIMER
+
+
+def timed(stage: str):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
@@ -0,0 +1,182 @@
+import os
+import tempfile
+from itertools import islice
+
+import numpy as np
+
+HASH_BATCH = 65_536             # names hashed (and looked up) per vectorized call
+RUN_SIZE = 16_000_000           # hashes (128 MB) sorted in memory before spilling to disk
+PARTITIONS = 256                # spill files, split on the top hash byte
+BLOOM_BITS = 10                 # filter bits per name: about 1% false positives
+BLOOM_PROBES = 7
+
+_EMPTY = np.empty(0, dtype=np.uint64)
+
+
+def name_hashes(names) -> np.ndarray:
+    # 64-bit SipHash of each name with pandas' fixed key, so hashes written
+    # to disk by one process match those of the next. Two different names
+    # share a hash with odds of about len(index) / 2**64 per lookup.
+    from pandas.util import hash_array
+
+    names = np.asarray(names if isinstance(names, list) else list(names), dtype=object)
+    if not len(names):
+        return _EMPTY
+    return hash_array(names, categorize=False)
+
+
+def _chunked(items, size=HASH_BATCH):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def _unique(hashes):
+    # Sorted in place, then adjacent duplicates dropped.
+    hashes.sort()
+    if len(hashes):
+        hashes = hashes[np.concatenate(([True], hashes[1:] != hashes[:-1]))]
+    return hashes
+
+
+def _spill(hashes, runs):
+    # Sorted, so each partition is one contiguous slice.
+    hashes.sort()
+    bounds = np.searchsorted(hashes >> np.uint64(56), np.arange(PARTITIONS + 1, dtype=np.uint64))
+    for n, run in enumerate(runs):
+        hashes[bounds[n]:bounds[n + 1]].tofile(run)
+
+
+def _sorted_unique(batches, run_size, out):
+    # Sorted distinct hashes. Small sets are sorted in memory; past run_size
+    # the hashes are spilled into partition files by their top byte, and
+    # each partition is sorted on its own and appended to out, which yields
+    # the whole array in order without ever holding it.
+    held, count, runs = [], 0, None
+    try:
+        for hashes in batches:
+            held.append(hashes)
+            count += len(hashes)
+            if count >= run_size:
+                if runs is None:
+                    runs = [tempfile.TemporaryFile() for _ in range(PARTITIONS)]
+                _spill(np.concatenate(held), runs)
+                held, count = [], 0
+        if runs is None:
+            unique = _unique(np.concatenate(held)) if held else _EMPTY
+            if out is None:
+                return unique
+            unique.tofile(out)
+            return None
+
+        if held:
+            _spill(np.concatenate(held), runs)
+        if out is None:
+            out = tempfile.TemporaryFile()
+        for run in runs:
+            run.seek(0)
+            _unique(np.fromfile(run, dtype=np.uint64)).tofile(out)
+        out.flush()
+        return out
+    finally:
+        for run in runs or ():
+            run.close()
+
+
+class DeliveredIndex:
+    # Delivered names as a sorted array of 64-bit hashes (8 bytes a name
+    # instead of a str in a set). An array memory-mapped from disk sits
+    # behind a Bloom filter that turns most misses away before any page of
+    # it is read; one in memory is searched directly.
+    def __init__(self, hashes: np.ndarray, bloom: np.ndarray | None = None):
+        self.hashes = hashes
+        if bloom is None and isinstance(hashes, np.memmap):
+            bloom = self._bloom(hashes)
+        self.bloom = bloom
+
+    @classmethod
+    def build(cls, names, path: str | None = None, run_size: int = RUN_SIZE):
+        # From any iterable of (already normalized) names, read once. With a
+        # path the index is written there and opened memory-mapped.
+        if path is None:
+            result = _sorted_unique(map(name_hashes, _chunked(names)), run_size, None)
+            if isinstance(result, np.ndarray):
+                return cls(result)
+            return cls(np.memmap(result, dtype=np.uint64, mode="r"))
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            _sorted_unique(map(name_hashes, _chunked(names)), run_size, f)
+        os.replace(tmp, path)
+        # An empty index is not memory-mapped and gets no filter of its own;
+        # it is still written one, so no stale filter is left at path.
+        index = cls.open(path, bloom=False)
+        bloom = index.bloom if index.bloom is not None else cls._bloom(index.hashes)
+        bloom.tofile(f"{path}.bloom")
+        return index
+
+    @classmethod
+    def open(cls, path: str, bloom: bool = True):
+        hashes = _EMPTY
+        if os.path.getsize(path):
+            hashes = np.memmap(path, dtype=np.uint64, mode="r")
+        filter_path = f"{path}.bloom"
+        if bloom and os.path.exists(filter_path):
+            return cls(hashes, np.fromfile(filter_path, dtype=np.uint8))
+        return cls(hashes)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    @staticmethod
+    def _probes(hashes, mask):
+        # Double hashing: probe i sits at h1 + i * h2 in the bit array.
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        for i in range(BLOOM_PROBES):
+            yield (h1 + np.uint64(i) * h2) & mask
+
+    @classmethod
+    def _bloom(cls, hashes):
+        size = 1 << max(int(len(hashes) * BLOOM_BITS - 1).bit_length(), 6)
+        bloom = np.zeros(size // 8, dtype=np.uint8)
+        mask = np.uint64(size - 1)
+        for start in range(0, len(hashes), HASH_BATCH):
+            for bit in cls._probes(np.asarray(hashes[start:start + HASH_BATCH]), mask):
+                np.bitwise_or.at(bloom, bit >> np.uint64(3), np.left_shift(1, bit & np.uint64(7)).astype(np.uint8))
+        return bloom
+
+    def contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+        if not len(self.hashes) or not len(hashes):
+            return found
+        candidates = np.arange(len(hashes))
+        if self.bloom is not None:
+            maybe = np.ones(len(hashes), dtype=bool)
+            mask = np.uint64(len(self.bloom) * 8 - 1)
+            for bit in self._probes(hashes, mask):
+                maybe &= ((self.bloom[bit >> np.uint64(3)] >> (bit & np.uint64(7)).astype(np.uint8)) & 1).astype(bool)
+            candidates = np.flatnonzero(maybe)
+
+            # Merge join of the sorted candidates against the mapped index:
+            # it is read front to back, touching only the pages it needs.
+            candidates = candidates[np.argsort(hashes[candidates])]
+
+        wanted = hashes[candidates]
+        at = np.searchsorted(self.hashes, wanted)
+        hit = np.asarray(self.hashes[np.minimum(at, len(self.hashes) - 1)]) == wanted
+        found[candidates[hit]] = True
+        return found
+
+    def contains(self, names) -> np.ndarray:
+        return self.contains_hashes(name_hashes(names))
+
+    def __contains__(self, name: str) -> bool:
+        return bool(self.contains([name])[0])
+
+    def missing(self, items, key):
+        # The items whose key(item) is not in the index, in order, looked up
+        # HASH_BATCH at a time so only one batch of keys is held.
+        for batch in _chunked(items):
+            found = self.contains(list(map(key, batch)))
+            yield from (item for item, hit in zip(batch, found) if not hit)
@@ -0,0 +1,130 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+PLAN_CACHE_SIZE = 32            # upload sets x option combinations remembered
+MEMO_SIZE = 100_000             # normalized names remembered per normalizer before starting over
+
+_SPECIAL = re.compile(r"[^a-zA-Z0-9_\-]")
+_REPEATED_SEPARATORS = re.compile(r"[_\-]{2,}")
+
+
+def remove_accents(text):
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(c)
+    )
+
+
+def collapse_separators(text):
+    return _REPEATED_SEPARATORS.sub("_", text)
+
+
+class _CharMap(dict):
+    # str.translate table filled on first sight of each character: accents,
+    # lowercase, spaces and special characters all act per character, so
+    # they fold into a single translate pass.
+    def __init__(self, lower, spaces, accents, special):
+        super().__init__()
+        self.lower, self.spaces, self.accents, self.special = lower, spaces, accents, special
+
+    def __missing__(self, code):
+        ch = chr(code)
+        if self.accents:
+            ch = remove_accents(ch)
+        if self.lower:
+            ch = ch.lower()
+        if self.spaces:
+            ch = ch.replace(" ", "_")
+        if self.special:
+            ch = _SPECIAL.sub("", ch)
+        self[code] = ch
+        return ch
+
+
+class FilenameNormalizer:
+    def __init__(self, lower=True, spaces=True, accents=True, special=True, collapse=True):
+        self.lower, self.spaces, self.accents = lower, spaces, accents
+        self.special, self.collapse = special, collapse
+        self._table = _CharMap(lower, spaces, accents, special)
+        self._memo = {}
+
+    def _stem_stepwise(self, new):
+        # The rules one after another, as Nomen always applied them.
+        if self.accents:
+            new = remove_accents(new)
+        if self.lower:
+            new = new.lower()
+        if self.spaces:
+            new = new.replace(" ", "_")
+        if self.special:
+            new = _SPECIAL.sub("", new)
+        if self.collapse:
+            new = collapse_separators(new)
+        return new
+
+    def stem(self, stem: str) -> str:
+        # Final sigma is the one lowercase rule that depends on context.
+        if self.lower and "Σ" in stem:
+            return self._stem_stepwise(stem)
+        new = stem.translate(self._table)
+        return collapse_separators(new) if self.collapse else new
+
+    def __call__(self, filename: str) -> str:
+        new = self._memo.get(filename)
+        if new is None:
+            # Normalizers live for the whole server process; dropping the
+            # memo when full keeps it bounded at the cost of a few misses.
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            stem, dot, ext = filename.rpartition(".")
+            new = self._memo[filename] = (
+                f"{self.stem(stem)}.{ext}" if dot else self.stem(filename)
+            )
+        return new
+
+
+@lru_cache(maxsize=32)          # one per combination of the five options
+def compile_normalizer(lower=True, spaces=True, accents=True, special=True,
+                       collapse=True) -> FilenameNormalizer:
+    return FilenameNormalizer(lower, spaces, accents, special, collapse)
+
+
+def _unique_name(name: str, taken: set) -> str:
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    n = 2
+    while True:
+        candidate = f"{stem}_{n}{dot}{ext}"
+        if candidate not in taken:
+            return candidate
+        n += 1
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def rename_plan(filenames: tuple, lower=True, spaces=True, accents=True, special=True,
+                collapse=True):
+    # (renames, collisions) for one upload set. renames holds
+    # (original, normalized, archive name) per file; when several originals
+    # normalize to the same name, all but the first get a numbered suffix
+    # in the archive instead of overwriting each other. collisions maps each
+    # such normalized name to its originals.
+    normalize = compile_normalizer(lower, spaces, accents, special, collapse)
+    normalized = [normalize(name) for name in filenames]
+
+    groups = {}
+    for original, new in zip(filenames, normalized):
+        groups.setdefault(new, []).append(original)
+    collisions = {new: originals for new, originals in groups.items() if len(originals) > 1}
+
+    taken, renames = set(normalized), []
+    seen = set()
+    for original, new in zip(filenames, normalized):
+        final = new
+        if new in seen:
+            final = _unique_name(new, taken)
+            taken.add(final)
+        seen.add(new)
+        renames.append((original, new, final))
+    return renames, collisions
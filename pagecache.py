@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit
+
+import metrics
+
+DEFAULT_CACHE_PATH = os.environ.get("PORTICUS_PAGE_CACHE", "page_cache.sqlite3")
+FRESH_FOR = 24 * 3600               # seconds a page is served without asking the server
+MAX_AGE = 30 * 24 * 3600            # seconds after which an entry is dropped outright
+MAX_BYTES = 512 * 1024 * 1024       # total extracted text kept on disk
+EVICT_EVERY = 500                   # stores between eviction passes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);
+CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched_at);
+"""
+
+CachedPage = namedtuple("CachedPage", "text etag last_modified fresh")
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str):
+    # None for a URL that does not parse (bad port, unclosed IPv6 bracket).
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if port and port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+
+def cache_key(url: str, variant: str = ""):
+    # The variant names how the text was extracted; canonical URLs never
+    # carry a fragment, so it cannot collide with a real address. Malformed
+    # URLs have no key and are never cached.
+    key = canonical_url(url)
+    if key is None:
+        return None
+    return f"{key}#{variant}" if variant else key
+
+
+def conditional_headers(entry) -> dict:
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+class PageCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, fresh_for=FRESH_FOR, max_age=MAX_AGE,
+                 max_bytes=MAX_BYTES):
+        self.path = path
+        self.fresh_for = fresh_for
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._stores = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def record(self, kind: str):
+        with self._lock:
+            self.stats[kind] += 1
+        metrics.count(f"page_cache_{kind}")
+
+    def hit_rate(self) -> float:
+        total = sum(self.stats.values())
+        return (self.stats["hits"] + self.stats["revalidated"]) / total if total else 0.0
+
+    def lookup(self, url: str, variant: str = ""):
+        now = time.time()
+        key = cache_key(url, variant)
+        if key is None:
+            return None
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT text, etag, last_modified, fetched_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            text, etag, last_modified, fetched_at = row
+            if now - fetched_at > self.max_age:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, key))
+        return CachedPage(text, etag, last_modified, now - fetched_at <= self.fresh_for)
+
+    def refresh(self, url: str, variant: str = ""):
+        # The server answered 304 Not Modified: the stored text is current again.
+        now, key = time.time(), cache_key(url, variant)
+        if key is None:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, key)
+            )
+
+    def store(self, url: str, text: str, etag=None, last_modified=None, variant: str = ""):
+        now, key = time.time(), cache_key(url, variant)
+        if key is None:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, text, etag, last_modified, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, text, etag, last_modified, now, now,
+                 len(text.encode("utf-8")))
+            )
+            self._stores += 1
+            due = self._stores % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM pages WHERE fetched_at < ?", (now - self.max_age,))
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+
+            # Least recently used first, until the budget is met again.
+            excess, cutoff = total - self.max_bytes, None
+            for accessed_at, size in self.conn.execute(
+                "SELECT accessed_at, size FROM pages ORDER BY accessed_at"
+            ):
+                excess -= size
+                cutoff = accessed_at
+                if excess <= 0:
+                    break
+            self.conn.execute("DELETE FROM pages WHERE accessed_at <= ?", (cutoff,))
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from diff import normalize
+from nameindex import DeliveredIndex
+
+SCAN_WORKERS = min(32, (os.cpu_count() or 4) * 4)    # directory listings are I/O-bound
+
+
+def _list_dir(path: str):
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        # Unreadable subdirectories on shared volumes are skipped, not fatal.
+        pass
+    return files, dirs
+
+
+def iter_files(root: str, workers=None):
+    # (relative path, path) for every file below root, in no particular
+    # order. Directories are listed concurrently and files are yielded as
+    # soon as their directory has been read.
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"Not a directory: {root}")
+    prefix = len(os.path.join(root, ""))
+
+    with ThreadPoolExecutor(max_workers=workers or SCAN_WORKERS) as pool:
+        pending = {pool.submit(_list_dir, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                pending.update(pool.submit(_list_dir, d) for d in dirs)
+                for path in files:
+                    yield path[prefix:].replace(os.sep, "/"), path
+
+
+def name_key(relpath: str) -> str:
+    # diff.normalize of the file name alone, the way Comparatio matches
+    # uploads: scan_01.jpg is delivered wherever scan_01.tif sits.
+    return normalize(relpath.rpartition("/")[2])
+
+
+def path_key(relpath: str) -> str:
+    # diff.normalize applied to the last component only, so a dotted
+    # directory name (v1.0/README) never loses its tail to the extension rule.
+    parent, _, name = relpath.rpartition("/")
+    return f"{parent.lower().strip()}/{normalize(name)}" if parent else normalize(name)
+
+
+def match_key(match_paths: bool = False):
+    # File names by default; whole relative paths when both trees share a layout.
+    return path_key if match_paths else name_key
+
+
+def list_files(root: str, workers=None) -> dict:
+    return dict(iter_files(root, workers))
+
+
+def delivered_names(root: str, workers=None, match_paths: bool = False) -> set:
+    key = match_key(match_paths)
+    return {key(rel) for rel, _ in iter_files(root, workers)}
+
+
+def delivered_index(root: str, workers=None, path: str | None = None,
+                    match_paths: bool = False) -> DeliveredIndex:
+    # match_key of every delivered file as a DeliveredIndex, written to
+    # path when given. Past nameindex.RUN_SIZE names it is built on disk.
+    key = match_key(match_paths)
+    return DeliveredIndex.build((key(rel) for rel, _ in iter_files(root, workers)), path=path)
+
+
+def iter_new_files(delivery_root: str, postprocessed_root: str, workers=None, delivered=None,
+                   match_paths: bool = False):
+    # Lazy counterpart of diff.find_new_files for folder trees, matched on
+    # the normalized file name (or path_key with match_paths). Only the
+    # delivered index is held; new files come out as (relative path, path),
+    # a batch at a time, and are read when packaged. delivered may be a
+    # prebuilt index built with the same key.
+    key = match_key(match_paths)
+    if delivered is None:
+        delivered = delivered_index(delivery_root, workers, match_paths=match_paths)
+    yield from delivered.missing(iter_files(postprocessed_root, workers), key=lambda entry: key(entry[0]))
@@ -1,25 +1,19 @@
 import streamlit as st
-import zipfile
-import pandas as pd
 import io
 import csv
-import re
 import random
-import unicodedata
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-from langdetect import detect, DetectorFactory
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Only light modules load up front; each tool imports what it needs (pandas,
+# the fetcher, langdetect, the keyword tables) the first time it is opened,
+# and Python keeps them for the rest of the process.
+import metrics
+from archive import write_zip
 
 # =========================
 # Global configuration
 # =========================
-DetectorFactory.seed = 0
-
-MAX_CONCURRENT_REQUESTS = 5     # simultaneous URL fetches
-BATCH_SIZE = 200               # URLs per batch (transparent to user)
+JOB_POLL_INTERVAL = 1.0         # seconds between background job status checks
+PAGE_SIZES = [100, 500, 1000, 5000]     # rows per page in large result tables
 
 # =========================
 INSPIRING_QUOTES = [
@@ -81,323 +75,87 @@ if "quotes_shuffled" not in st.session_state:
     random.shuffle (INSPIRING_QUOTES)
     st.session_state.quotes_shuffled = True
     
-# =========================
-# Language → Family mapping
-# =========================
-LANGUAGE_TO_FAMILY = {
-    # Germanic
-    "en": "germanic", "de": "germanic", "nl": "germanic",
-    "sv": "germanic", "da": "germanic", "no": "germanic", "is": "germanic",
-    # Romance
-    "es": "romance", "fr": "romance", "it": "romance",
-    "pt": "romance", "ro": "romance",
-    # Slavic
-    "ru": "slavic", "pl": "slavic", "cs": "slavic", "sk": "slavic",
-    "uk": "slavic", "bg": "slavic", "sr": "slavic", "hr": "slavic",
-    # Baltic
-    "lt": "baltic", "lv": "baltic",
-    # Celtic
-    "ga": "celtic", "gd": "celtic", "cy": "celtic", "br": "celtic",
-    # Uralic
-    "fi": "uralic", "et": "uralic", "hu": "uralic",
-}
-
-# =========================
-# Keyword sets by family
-# =========================
-KEYWORDS_BY_FAMILY = {
-
-    # =========================
-    # GERMANIC
-    # =========================
-    "germanic": {
-        "Education": [
-            "school", "schools", "education", "educational", "student", "students",
-            "teacher", "teachers", "university", "college", "campus", "degree",
-            "course", "courses", "curriculum", "enrollment", "admissions",
-            "training", "academy", "learning", "learning platform", "lms"
-        ],
-        "Finance": [
-            "bank", "banking", "financial", "finance", "loan", "credit", "debit",
-            "account", "accounts", "payment", "payments", "billing", "invoice",
-            "transaction", "transfer", "interest", "mortgage", "insurance",
-            "policy", "premium", "portfolio", "investment", "fund", "capital"
-        ],
-        "Medical": [
-            "health", "healthcare", "medical", "medicine", "doctor", "physician",
-            "hospital", "clinic", "patient", "patients", "appointment",
-            "treatment", "therapy", "prescription", "pharmacy", "diagnosis",
-            "care", "wellness", "mental health"
-        ],
-        "Retail": [
-            "store", "shop", "retail", "product", "products", "catalog",
-            "order", "orders", "purchase", "checkout", "cart", "customer",
-            "pricing", "price", "sale", "discount", "promotion", "shipping",
-            "delivery", "returns", "refund"
-        ],
-        "Tax": [
-            "tax", "taxes", "taxation", "income tax", "sales tax", "vat",
-            "fiscal", "tax return", "filing", "deduction", "withholding",
-            "tax authority", "revenue service", "audit", "compliance"
-        ],
-        "Travel": [
-            "travel", "trip", "tourism", "flight", "airline", "airport",
-            "hotel", "accommodation", "booking", "reservation", "destination",
-            "itinerary", "vacation", "holiday", "ticket", "boarding pass"
-        ],
-        "Vehicle": [
-            "vehicle", "vehicles", "car", "auto", "automobile", "truck",
-            "motorcycle", "engine", "registration", "license", "inspection",
-            "insurance", "maintenance", "service", "repair", "dealer"
-        ],
-    },
-
-    # =========================
-    # ROMANCE
-    # =========================
-    "romance": {
-        "Education": [
-            "escuela", "école", "scuola", "educación", "éducation", "istruzione",
-            "estudiante", "étudiant", "studente", "universidad", "université",
-            "università", "curso", "cours", "corso", "formación", "formation",
-            "apprentissage", "enseñanza", "insegnamento"
-        ],
-        "Finance": [
-            "banco", "banque", "banca", "finanzas", "finance", "credito", "crédit",
-            "cuenta", "compte", "conto", "pago", "paiement", "pagamento",
-            "factura", "facturation", "assurance", "seguro", "investissement",
-            "investimento", "fonds", "capital"
-        ],
-        "Medical": [
-            "salud", "santé", "salute", "medicina", "médical", "médico",
-            "doctor", "médecin", "ospedale", "hospital", "clínica", "clinique",
-            "paciente", "patient", "traitement", "traitement", "prescripción",
-            "farmacia"
-        ],
-        "Retail": [
-            "tienda", "magasin", "negozio", "venta", "vente", "vendita",
-            "producto", "produit", "prodotto", "pedido", "commande", "ordine",
-            "cliente", "client", "prezzo", "prix", "promoción", "réduction"
-        ],
-        "Tax": [
-            "impuesto", "impuestos", "taxe", "impôt", "imposta",
-            "fiscal", "fiscale", "iva", "tva", "déclaration",
-            "retenue", "retención", "autorité fiscale"
-        ],
-        "Travel": [
-            "viaje", "voyage", "viaggio", "vuelo", "vol", "volo",
-            "hotel", "hébergement", "prenotazione", "réservation",
-            "destino", "destination", "vacances", "vacaciones"
-        ],
-        "Vehicle": [
-            "vehículo", "véhicule", "veicolo", "auto", "voiture",
-            "immatriculation", "registrazione", "assicurazione",
-            "réparation", "entretien", "concessionnaire"
-        ],
-    },
-
-    # =========================
-    # SLAVIC
-    # =========================
-    "slavic": {
-        "Education": [
-            "школа", "университет", "образование", "учеба", "студент",
-            "student", "kurs", "edukacja", "nauka", "uczelnia"
-        ],
-        "Finance": [
-            "банк", "kredyt", "кредит", "płatność", "платеж",
-            "konto", "счет", "ubezpieczenie", "страхование"
-        ],
-        "Medical": [
-            "здоровье", "zdrowie", "zdraví", "врач", "lekarz",
-            "больница", "szpital", "лечение", "terapia"
-        ],
-        "Retail": [
-            "магазин", "sklep", "zakup", "покупка", "заказ",
-            "zamówienie", "klient", "cena"
-        ],
-        "Tax": [
-            "налог", "podatek", "daň", "фискальный",
-            "rozliczenie", "deklaracja"
-        ],
-        "Travel": [
-            "путешествие", "podróż", "cestování", "hotel",
-            "lot", "рейс"
-        ],
-        "Vehicle": [
-            "автомобиль", "samochód", "vozidlo", "rejestracja",
-            "страховка", "ubezpieczenie"
-        ],
-    },
-
-    # =========================
-    # BALTIC
-    # =========================
-    "baltic": {
-        "Education": [
-            "mokykla", "haridus", "õpe", "õpilane", "studentas",
-            "universitetas", "ülikool"
-        ],
-        "Finance": [
-            "bankas", "pank", "konto", "makse", "laen",
-            "kindlustus", "toetus"
-        ],
-        "Medical": [
-            "sveikata", "tervis", "gydytojas", "arst",
-            "haigla", "ligoninė"
-        ],
-        "Retail": [
-            "parduotuvė", "pood", "klientas", "klient",
-            "kaina", "hind"
-        ],
-        "Tax": [
-            "mokestis", "mokesčiai", "maks", "maksustamine"
-        ],
-        "Travel": [
-            "kelionė", "reis", "viešbutis", "majutus"
-        ],
-        "Vehicle": [
-            "automobilis", "auto", "registreerimine", "registracija"
-        ],
-    },
-
-    # =========================
-    # CELTIC
-    # =========================
-    "celtic": {
-        "Education": [
-            "scoil", "oideachas", "foghlaim", "mac léinn"
-        ],
-        "Finance": [
-            "banc", "íocaíocht", "airgead", "iasacht"
-        ],
-        "Medical": [
-            "sláinte", "dochtúir", "othar"
-        ],
-        "Retail": [
-            "siopa", "custaiméir", "praghas"
-        ],
-        "Tax": [
-            "cáin", "ioncam"
-        ],
-        "Travel": [
-            "taisteal", "óstán"
-        ],
-        "Vehicle": [
-            "feithicil", "carr"
-        ],
-    },
-
-    # =========================
-    # URALIC
-    # =========================
-    "uralic": {
-        "Education": [
-            "koulu", "koulutus", "oppilaitos", "opiskelija",
-            "yliopisto", "ammattikorkeakoulu", "opinto",
-            "haridus", "õpilane", "ülikool",
-            "iskola", "oktatás", "tanuló", "egyetem"
-        ],
-        "Finance": [
-            "pankki", "pank", "bank", "tili", "konto", "számla",
-            "laina", "laen", "hitel", "maksu", "makse", "fizetés",
-            "rahoitus", "kindlustus", "biztosítás",
-            "etuus", "toetus", "támogatás", "kela"
-        ],
-        "Medical": [
-            "terveys", "tervis", "egészség",
-            "lääkäri", "arst", "orvos",
-            "sairaala", "haigla", "kórház",
-            "potilas", "patsient", "beteg"
-        ],
-        "Retail": [
-            "kauppa", "pood", "bolt",
-            "ostos", "ost", "vásárlás",
-            "asiakas", "klient", "ügyfél"
-        ],
-        "Tax": [
-            "vero", "verotus", "verohallinto",
-            "maks", "maksustamine",
-            "adó", "adózás", "adóhatóság"
-        ],
-        "Travel": [
-            "matka", "reis", "utazás",
-            "lento", "lend", "repülés",
-            "oleskelulupa", "viisumi", "vízum"
-        ],
-        "Vehicle": [
-            "ajoneuvo", "sõiduk", "jármű",
-            "auto", "autó",
-            "rekisteröinti", "registreerimine",
-            "vakuutus", "biztosítás"
-        ],
-    },
-}
-
-
 # =========================
 # Utility functions
 # =========================
-def normalize(text: str) -> str:
-    text = text.lower()
-    text = re.sub(r"[^a-zA-ZÀ-ž0-9\s]", " ", text)
-    return re.sub(r"\s+", " ", text)
-
 def normalize_filename(filename: str) -> str:
     name = filename.lower().strip()
     if "." in name:
         name = name.rsplit(".", 1)[0]
     return name
 
-def detect_document_language(df, columns):
-    try:
-        sample = " ".join(df[columns].astype(str).head(20).values.flatten())
-        return detect(sample)
-    except Exception:
-        return "en"  # safe default
-
-def detect_sector(text: str, keywords: dict) -> str:
-    text = normalize(text)
-    scores = {s: sum(1 for kw in kws if kw in text) for s, kws in keywords.items()}
-    best = max(scores, key=scores.get)
-    return best if scores[best] > 0 else "Out of domain scope"
-
-@st.cache_data(ttl=3600)
-def fetch_domain_text(url: str) -> str:
-    try:
-        clean_url = url.split("#")[0]
-        r = requests.get(clean_url, timeout=2)
-        soup = BeautifulSoup(r.text, "html.parser")
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        return normalize(soup.get_text())
-    except Exception:
-        return ""
-
-def safe_fetch(url: str) -> str:
-    if not url.lower().startswith(("http://", "https://")):
-        return ""
-    try:
-        return fetch_domain_text(url)
-    except Exception:
-        return ""
-
-def chunked(iterable, size):
-    for i in range(0, len(iterable), size):
-        yield iterable[i:i + size], i
-        
 def progress_message(done, total):
-    pct = (done / total) * 100 if total else 0
+    if not total:
+        return f"Processed {done} rows"
+    pct = (done / total) * 100
     return f"Processed {done} / {total} rows ({pct:.2f}%)"
 
-def remove_accents(text):
-    return "".join(
-        c for c in unicodedata.normalize("NFKD", text)
-        if not unicodedata.combining(c)
-    )
-
-def collapse_separators(text):
-    return re.sub(r"[_\-]{2,}", "_", text)
+def upload_key(files):
+    # Identity of an upload (or list of uploads): Streamlit gives every
+    # uploaded file a new file_id, so the key changes only on re-upload.
+    if files is None:
+        return None
+    if not isinstance(files, list):
+        files = [files]
+    return tuple((getattr(f, "file_id", None), f.name, f.size) for f in files)
+
+def remembered(slot, key, compute, run=True):
+    # compute() once per key and keep it in session_state, so later reruns
+    # (a toggle, a download click) reuse the result. Returns None when
+    # nothing is held for key and run is False.
+    held = st.session_state.get(slot)
+    if held is not None and held[0] == key:
+        return held[1]
+    if not run:
+        return None
+    value = compute()
+    st.session_state[slot] = (key, value)
+    return value
+
+def show_near_misses(names, load_reference, label, csv_name, key):
+    # Best fuzzy match and its similarity for every unmatched name,
+    # computed once per key.
+    import pandas as pd
+    from fuzzy import near_misses
+
+    rows = remembered("near_misses", key, lambda: near_misses(names, load_reference()))
+    report = pd.DataFrame(rows, columns=[label, "Closest match", "Similarity"])
+    report = report.sort_values("Similarity", ascending=False, kind="stable")
+    st.write(f"Near misses: {int(report['Closest match'].notna().sum())} of {len(report)} have a close match")
+    st.dataframe(report)
+    st.download_button("Download near misses (CSV)", report.to_csv(index=False), csv_name)
+
+def show_metrics():
+    import pandas as pd
+
+    snapshot = metrics.registry.snapshot()
+    with st.expander("Timing metrics"):
+        if not snapshot["stages"] and not snapshot["counters"]:
+            st.write("Nothing recorded yet.")
+            return
+        st.dataframe(pd.DataFrame(
+            [
+                (stage, s["count"], s["seconds"], s["mean"] * 1e3, s["p95"] * 1e3)
+                for stage, s in snapshot["stages"].items()
+            ],
+            columns=["Stage", "Calls", "Total (s)", "Mean (ms)", "p95 ≤ (ms)"]
+        ))
+        st.dataframe(pd.DataFrame(snapshot["counters"].items(), columns=["Counter", "Value"]))
+        st.download_button("Download metrics (JSON)", metrics.registry.to_json(), "metrics.json")
+        st.download_button("Download metrics (Prometheus)", metrics.registry.to_prometheus(), "porticus.prom")
+        if st.button("Reset metrics for all sessions"):
+            metrics.registry.reset()
+
+def deferred_zip(members):
+    # Built only when the download is clicked. Streamlit cannot stream a
+    # download: whatever data returns (bytes, file object or callable) is
+    # read whole into its in-memory media store. So the archive is built in
+    # memory once; flat memory for large deliveries is `cli.py diff --zip`.
+    def build():
+        buf = io.BytesIO()
+        write_zip(members, buf)
+        return buf.getvalue()
+    return build
 
 
 # =========================
@@ -416,6 +174,9 @@ tool = st.sidebar.radio(
         "Gratia (Inspire me)"
     ]
 )
+# Collection is a server setting (PORTICUS_METRICS=1): the registry is
+# shared by every session, so a session only chooses whether to look.
+show_timings = metrics.registry.enabled and st.sidebar.checkbox("Show timing metrics")
 
 # =========================
 # Home
@@ -434,6 +195,9 @@ if tool == "Home":
 # Comparatio
 # =========================
 if tool == "Comparatio (Folder Difference)":
+    from diff import find_changed_files
+    from manifest import DeliveryManifest
+
     st.title("Comparatio")
 
     st.markdown(
@@ -441,81 +205,209 @@ if tool == "Comparatio (Folder Difference)":
         "File extensions are ignored, and input files are never modified."
 )
 
-    a = st.file_uploader("Folder A", accept_multiple_files=True)
+    use_manifest = st.checkbox(
+        "Compare against recorded delivery rounds instead of Folder A",
+        value=False
+    )
+
+    if use_manifest:
+        with DeliveryManifest() as manifest:
+            rounds = manifest.rounds()
+        selected_rounds = st.multiselect(
+            "Delivery rounds",
+            rounds,
+            default=rounds,
+            format_func=lambda r: f"{r[1]} ({r[3]} files)"
+        )
+        a = None
+        check_content = False
+    else:
+        a = st.file_uploader("Folder A", accept_multiple_files=True)
+
     b = st.file_uploader("Folder B", accept_multiple_files=True)
 
-    if st.button("Compare"):
-        if not a or not b:
-            st.error("Upload both folders.")
-        else:
-            names_a = {normalize_filename(f.name) for f in a}
-            diff = [f for f in b if normalize_filename(f.name) not in names_a]
+    if not use_manifest:
+        check_content = st.checkbox(
+            "Also include files whose name matches but content changed",
+            value=False
+        )
 
-            buf = io.BytesIO()
-            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
-                for f in diff:
-                    z.writestr(f.name, f.read())
-            buf.seek(0)
+    fuzzy_report = st.checkbox(
+        "Report near misses (closest delivered name for each new file)",
+        value=False
+    )
 
-            st.download_button("Download ZIP", buf, "new_files.zip")
+    round_ids = [r[0] for r in selected_rounds] if use_manifest else None
+    inputs = ("comparatio", upload_key(b), round_ids if use_manifest else upload_key(a), check_content)
+
+    def compare():
+        # (members, summary, new names); kept per upload set and options.
+        if use_manifest:
+            with DeliveryManifest() as manifest:
+                new = manifest.find_new_files({f.name: f for f in b}, rounds=round_ids)
+            return new, f"New files: {len(new)}", [n for n, _ in new]
+        if check_content:
+            new, changed = find_changed_files(
+                {f.name: f for f in a}, {f.name: f for f in b}
+            )
+            return new + changed, f"New files: {len(new)} | Changed files: {len(changed)}", [n for n, _ in new]
+        names_a = {normalize_filename(f.name) for f in a}
+        members = [(f.name, f) for f in b if normalize_filename(f.name) not in names_a]
+        return members, None, [n for n, _ in members]
+
+    def delivered_names():
+        if use_manifest:
+            with DeliveryManifest() as manifest:
+                return list(manifest.filenames(rounds=round_ids))
+        return [f.name for f in a]
+
+    clicked = st.button("Compare")
+    if clicked and use_manifest and not b:
+        st.error("Upload Folder B.")
+    elif clicked and not use_manifest and (not a or not b):
+        st.error("Upload both folders.")
+    else:
+        result = remembered("comparatio", inputs, compare, run=clicked)
+        if result is not None:
+            members, summary, new_names = result
+            if summary:
+                st.info(summary)
+
+            st.download_button(
+                "Download ZIP", deferred_zip(members), "new_files.zip",
+                mime="application/zip"
+            )
+            if fuzzy_report:
+                show_near_misses(new_names, delivered_names, "New file", "near_misses.csv", inputs)
+
+    if use_manifest:
+        round_label = st.text_input("Record Folder B as a delivery round", placeholder="round-1")
+        if st.button("Record round"):
+            if not b or not round_label:
+                st.error("Upload Folder B and enter a round label.")
+            else:
+                try:
+                    with DeliveryManifest() as manifest:
+                        manifest.commit_round(round_label, {f.name: f for f in b})
+                    st.success(f"Recorded {len(b)} files as round {round_label}.")
+                except ValueError as e:
+                    st.error(str(e))
 
 # =========================
 # Collectio
 # =========================
 if tool == "Collectio (Excel File Lookup)":
+    from ingest import TABLE_TYPES, iter_table
+
     st.title("Collectio")
    
     st.markdown(
         "Uses a list of filenames from an Excel file to locate matching files in a folder. "
         "All matches are copied into a single ZIP for download."
 )
-    excel = st.file_uploader("Excel file", type=["xlsx"])
+    excel = st.file_uploader("Excel file", type=TABLE_TYPES)
     files = st.file_uploader("Files", accept_multiple_files=True)
+    fuzzy_report = st.checkbox(
+        "Report near misses (closest uploaded file for each name not found)",
+        value=False
+    )
 
-    if st.button("Collect"):
-        df = pd.read_excel(excel)
-        targets = df.iloc[:, 0].astype(str).str.lower().tolist()
+    inputs = ("collectio", upload_key(excel), upload_key(files))
 
+    def file_index():
         index = {}
         for f in files:
             index.setdefault(normalize_filename(f.name), []).append(f)
-
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
-            for t in targets:
-                for f in index.get(t, []):
-                    z.writestr(f.name, f.read())
-        buf.seek(0)
-
-        st.download_button("Download ZIP", buf, "collected_files.zip")
+        return index
+
+    def collect():
+        # The file index is kept on its own, so a new list reuses it.
+        index = remembered("collectio_index", upload_key(files), file_index)
+
+        # Only the first column is read, a chunk at a time.
+        members, missing = [], []
+        for chunk in iter_table(excel, columns=[0]):
+            for t in chunk.iloc[:, 0].dropna().astype(str).str.lower():
+                found = index.get(t)
+                if found:
+                    members.extend((f.name, f) for f in found)
+                else:
+                    missing.append(t)
+        return members, missing
+
+    clicked = st.button("Collect")
+    if clicked and (not excel or not files):
+        st.error("Upload the Excel file and the files.")
+    else:
+        result = remembered("collectio", inputs, collect, run=clicked)
+        if result is not None:
+            members, missing = result
+            st.download_button(
+                "Download ZIP", deferred_zip(members), "collected_files.zip",
+                mime="application/zip"
+            )
+            if fuzzy_report and missing:
+                show_near_misses(
+                    missing, lambda: [f.name for f in files], "Listed name", "near_misses.csv", inputs
+                )
 
 # =========================
 # Duplicatio
 # =========================
 if tool == "Duplicatio (Common Files)":
+    from duplicates import find_duplicates, write_report
+
     st.title("Duplicatio")
     
     st.markdown(
         "Identifies filenames that appear in both uploaded folders and produces "
-        "a CSV report listing the overlaps."
+        "a CSV report listing the overlaps. Can also find files with identical "
+        "content in both folders, whatever their names (empty files are ignored)."
 )
     
     a = st.file_uploader("Folder A", accept_multiple_files=True)
     b = st.file_uploader("Folder B", accept_multiple_files=True)
+    by_content = st.checkbox("Match by content (identical bytes in A and B, any name)", value=False)
 
-    if st.button("Find duplicates"):
-        dupes = sorted({f.name for f in a} & {f.name for f in b})
+    def find():
+        # (CSV report, caption)
         csv_buf = io.StringIO()
-        writer = csv.writer(csv_buf)
-        writer.writerow(["filename"])
-        for d in dupes:
-            writer.writerow([d])
-        st.download_button("Download CSV", csv_buf.getvalue(), "duplicates.csv")
+        caption = None
+        if by_content:
+            clusters = find_duplicates({
+                "A": {f.name: f for f in a or []},
+                "B": {f.name: f for f in b or []},
+            })
+            write_report(clusters, csv_buf)
+            caption = f"{len(clusters)} clusters of identical files shared by A and B"
+        else:
+            dupes = sorted({f.name for f in a or []} & {f.name for f in b or []})
+            writer = csv.writer(csv_buf)
+            writer.writerow(["filename"])
+            for d in dupes:
+                writer.writerow([d])
+        return csv_buf.getvalue(), caption
+
+    result = remembered(
+        "duplicatio", ("duplicatio", upload_key(a), upload_key(b), by_content), find,
+        run=st.button("Find duplicates")
+    )
+    if result is not None:
+        report, caption = result
+        if caption:
+            st.caption(caption)
+        st.download_button("Download CSV", report, "duplicates.csv")
 
 # =========================
 # Classificatio
 # =========================
 if tool == "Classificatio (Multilingual URL Domain)":
+    import jobs
+    from classify import CLASSIFY_WORKERS, ClassifyPool
+    from export import export_types
+    from ingest import TABLE_TYPES
+    from keywords import KEYWORDS_BY_FAMILY
+
     st.title("Classificatio")
 
     st.markdown(
@@ -524,85 +416,115 @@ if tool == "Classificatio (Multilingual URL Domain)":
     )
 
     use_web = st.checkbox(
-        "Use webpage content (processed in safe concurrent batches — slow)",
+        "Use webpage content (fetched concurrently, a few per site — slow)",
+        value=False
+    )
+    use_processes = st.checkbox(
+        f"Classify on all {CLASSIFY_WORKERS} CPU cores (for very large files)",
         value=False
     )
-    uploaded = st.file_uploader("Upload Excel file", type=["xlsx"])
+    uploaded = st.file_uploader("Upload Excel file", type=TABLE_TYPES)
+
+    @st.cache_resource
+    def classify_pool():
+        # One set of worker processes for the whole server, started on first
+        # use. Forked: spawned workers would re-run this script as __main__.
+        return ClassifyPool(KEYWORDS_BY_FAMILY, unsupported=jobs.UNSUPPORTED, context="fork")
+
+    @st.fragment(run_every=JOB_POLL_INTERVAL)
+    def job_progress(job):
+        # Polls the background job; the page is redrawn once it stops running.
+        if not jobs.is_running(job.id):
+            st.rerun()
+        state = job.state()
+        total, done = state["total"], state["rows_seen"]
+        st.progress(min(done / total, 1.0) if total else 0.0)
+        st.write(progress_message(done, total))
+        if st.button("Stop"):
+            jobs.stop(job.id)
+
+    def open_job():
+        jobs.prune()
+        return jobs.ClassifyJob.create(uploaded, uploaded.name, use_web=use_web)
 
     if uploaded:
-        df = pd.read_excel(uploaded)
-
-        if df.shape[1] < 4:
-            st.error("Excel must contain at least 4 columns.")
+        # Runs as a background job keyed on the file's bytes and options, so
+        # clicks, refreshes and restarts only poll it. Finished chunks are
+        # checkpointed to disk and never fetched or classified again.
+        job = remembered("classificatio_job", ("classificatio", upload_key(uploaded), use_web), open_job)
+        pool = classify_pool() if use_processes else None
+        state = job.state()
+
+        def export_bytes(fmt):
+            # Built when the download is clicked, from the results on disk.
+            with open(job.export(fmt), "rb") as f:
+                return f.read()
+
+        if state["status"] in ("queued", "running"):
+            jobs.start(job, pool)
+
+        if jobs.is_running(job.id):
+            job_progress(job)
+            st.stop()
+        if state["status"] == "failed":
+            st.error(state["error"])
+            if st.button("Retry"):
+                jobs.start(job, pool)
+                st.rerun()
+            st.stop()
+        if state["status"] == "stopped":
+            st.warning(f"Stopped after {progress_message(state['rows_done'], state['total']).lower()}.")
+            if st.button("Resume"):
+                jobs.start(job, pool)
+                st.rerun()
+            if state["rows_done"]:
+                st.download_button(
+                    "Download rows so far (CSV)",
+                    lambda: export_bytes("csv"),
+                    f"{state['name'].rsplit('.', 1)[0]}_partial.csv"
+                )
             st.stop()
 
-        col_a = df.columns[0]
-        col_c = df.columns[2]
-        col_d = df.columns[3]
-
-        lang = detect_document_language(df, [col_a, col_c])
-        family = LANGUAGE_TO_FAMILY.get(lang)
-
-        if not family:
+        lang, family_counts = state["lang"], state["family_counts"]
+        if not family_counts:
             st.error(f"Unsupported language detected: {lang}")
             st.stop()
 
-        st.info(f"Detected language: {lang.upper()} | Family: {family.capitalize()}")
-
-        keywords = KEYWORDS_BY_FAMILY[family]
-        total_rows = len(df)
-
-        progress_bar = st.progress(0.0)
-        status_text = st.empty()
-
-        # -------------------------
-        # Web fetching (batched)
-        # -------------------------
-        if use_web:
-            urls = df[col_d].astype(str).str.strip().tolist()
-            web_texts = [""] * total_rows
-            processed = 0
-
-            for batch_urls, offset in chunked(urls, BATCH_SIZE):
-                with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
-                    future_map = {
-                        executor.submit(safe_fetch, url): idx
-                        for idx, url in enumerate(batch_urls)
-                    }
-
-                    for future in as_completed(future_map):
-                        idx = future_map[future]
-                        web_texts[offset + idx] = future.result()
-                        processed += 1
-                        
-                        progress_bar.progress(processed / total_rows)
-                        status_text.write(
-                            f"Processed {processed} / {total_rows} rows "
-                            f"({(processed / total_rows) * 100:.2f}%)"
-                        )
-
-            progress_bar.progress(1.0)
-            status_text.write(
-                f"Processed {total_rows} / {total_rows} rows (100.00%)"
+        rows = state["rows_done"]
+        st.progress(1.0)
+        st.write(progress_message(rows, rows))
+
+        st.info(
+            f"Detected language: {lang.upper()} | Families: "
+            + ", ".join(f"{f.capitalize()} ({n})" for f, n in
+                        sorted(family_counts.items(), key=lambda kv: -kv[1]))
+        )
+        if state["cache_stats"] is not None:
+            stats = state["cache_stats"]
+            st.caption(
+                f"Page cache: {stats['hits']} fresh, "
+                f"{stats['revalidated']} revalidated, "
+                f"{stats['misses']} fetched"
             )
         else:
-            web_texts = [""] * total_rows
-            progress_bar.progress(1.0)
-            status_text.write("Web content fetching skipped.")
-
-        # -------------------------
-        # Classification
-        # -------------------------
-        sectors = []
-        for i, (_, row) in enumerate(df.iterrows(), start=1):
-            base_text = f"{row[col_a]} {row[col_c]}"
-            full_text = base_text + " " + web_texts[i - 1]
-            sectors.append(detect_sector(full_text, keywords))
-
-        df["Sector"] = sectors
-        st.dataframe(df[[col_a, col_c, col_d, "Sector"]])
-
-        st.caption("Each row is processed independently. One URL per row.")
+            st.caption("Web content fetching skipped.")
+
+        # Results stay on disk; only the page on screen is loaded and sent.
+        size_col, page_col = st.columns(2)
+        page_size = size_col.selectbox("Rows per page", PAGE_SIZES, index=1)
+        pages = max(1, -(-rows // page_size))
+        page = page_col.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1)
+        start = (page - 1) * page_size
+        st.dataframe(job.rows(start, start + page_size))
+        st.caption(f"Rows {min(start + 1, rows)}–{min(start + page_size, rows)} of {rows}. "
+                   "Each row is processed independently. One URL per row.")
+
+        fmt = st.selectbox("Export format", export_types(), format_func=str.upper)
+        st.download_button(
+            f"Download results ({fmt.upper()})",
+            lambda: export_bytes(fmt),
+            f"{state['name'].rsplit('.', 1)[0]}_classified.{fmt}"
+        )
 
 # =========================
 # Gratia
@@ -649,66 +571,58 @@ if tool == "Nomen (Filename Normalizer)":
     opt_collapse = st.checkbox("Collapse repeated separators (__ → _)", value=True)
 
     if files:
-        preview = []
-
-        for f in files:
-            name, ext = f.name.rsplit(".", 1)
-            new = name
-
-            if opt_accents:
-                new = remove_accents(new)
+        import pandas as pd
 
-            if opt_lower:
-                new = new.lower()
+        from nomen import rename_plan
 
-            if opt_spaces:
-                new = new.replace(" ", "_")
-
-            if opt_special:
-                new = re.sub(r"[^a-zA-Z0-9_\-]", "", new)
-
-            if opt_collapse:
-                new = collapse_separators(new)
-
-            new_name = f"{new}.{ext}"
-            preview.append((f.name, new_name))
+        # One compiled normalizer per rule set; the plan is memoized per
+        # upload set and shared by the preview and the ZIP.
+        renames, collisions = rename_plan(
+            tuple(f.name for f in files),
+            lower=opt_lower, spaces=opt_spaces, accents=opt_accents,
+            special=opt_special, collapse=opt_collapse
+        )
 
         st.markdown("### Preview")
         st.dataframe(
             pd.DataFrame(
-                preview,
-                columns=["Original filename", "Normalized filename"]
+                renames,
+                columns=["Original filename", "Normalized filename", "Name in ZIP"]
             )
         )
 
+        if collisions:
+            st.warning(
+                f"{len(collisions)} normalized names are shared by several files; "
+                "the ZIP numbers the extra copies instead of overwriting them."
+            )
+            st.dataframe(
+                pd.DataFrame(
+                    [(new, original) for new, originals in collisions.items() for original in originals],
+                    columns=["Normalized filename", "Original filename"]
+                )
+            )
+
         if st.button("Download normalized ZIP"):
-            buf = io.BytesIO()
-            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
-                for f in files:
-                    name, ext = f.name.rsplit(".", 1)
-                    new = name
-
-                    if opt_accents:
-                        new = remove_accents(new)
-                    if opt_lower:
-                        new = new.lower()
-                    if opt_spaces:
-                        new = new.replace(" ", "_")
-                    if opt_special:
-                        new = re.sub(r"[^a-zA-Z0-9_\-]", "", new)
-                    if opt_collapse:
-                        new = collapse_separators(new)
-
-                    z.writestr(f"{new}.{ext}", f.read())
-
-            buf.seek(0)
+            members = [(final, f) for f, (_, _, final) in zip(files, renames)]
+
             st.download_button(
                 "Download ZIP",
-                buf,
-                "normalized_files.zip"
+                deferred_zip(members),
+                "normalized_files.zip",
+                mime="application/zip"
             )
 
+# =========================
+# Metrics
+# =========================
+if show_timings:
+    show_metrics()
+
 # =========================
 # Footer
 # =========================
-st.caption("Files are processed in-memory only. Porticus is an internal utility.")
+st.caption(
+    "Archives are built in memory when the download is clicked; use the CLI for very large ones. "
+    "Porticus is an internal utility."
+)
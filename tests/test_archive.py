@@ -0,0 +1,44 @@
+import io
+import os
+import zipfile
+
+from archive import iter_zip
+
+
+class Stream:
+    # A source with neither a size nor a buffer, read only once.
+    def __init__(self, data):
+        self._f = io.BytesIO(data)
+
+    def read(self, n):
+        return self._f.read(n)
+
+
+def test_members_round_trip_in_order():
+    upload = io.BytesIO(b"shared upload " * 20_000)
+    members = [
+        ("report.txt", b"line\n" * 50_000),
+        ("photo.JPG", os.urandom(200_000)),
+        ("Été.csv", upload),
+        ("copy.csv", upload),
+        ("stream.log", Stream(b"abc" * 40_000)),
+        ("empty.txt", b""),
+    ]
+    z = zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(members, workers=3))))
+
+    assert z.testzip() is None
+    assert z.namelist() == [name for name, _ in members]
+    assert z.read("photo.JPG") == members[1][1]
+    assert z.read("copy.csv") == z.read("Été.csv") == upload.getvalue()
+    assert z.read("stream.log") == b"abc" * 40_000
+    methods = {info.filename: info.compress_type for info in z.infolist()}
+    assert methods["photo.JPG"] == zipfile.ZIP_STORED
+    assert methods["report.txt"] == zipfile.ZIP_DEFLATED
+
+
+def test_stored_archive_and_zip64_entry_count():
+    members = [(f"m{i}.txt", b"%d" % i) for i in range(70_000)]
+    z = zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(members, compression=zipfile.ZIP_STORED))))
+    assert len(z.infolist()) == 70_000
+    assert z.read("m69999.txt") == b"69999"
+    assert {info.compress_type for info in z.infolist()} == {zipfile.ZIP_STORED}
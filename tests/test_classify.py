@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from classify import ClassifyPool, classify_frames
+from keywords import KEYWORDS_BY_FAMILY
+
+
+def frames():
+    rows = [
+        ("Bank loans and accounts", "insurance", "http://a"),
+        ("Hotel rooms", "restaurant", "http://b"),
+        ("École primaire et collège", "enseignement pour les élèves", "http://c"),
+        ("Банк кредиты", "страхование", "http://d"),
+        ("nothing here", "", "http://e"),
+    ] * 40
+    for start in range(0, len(rows), 60):
+        df = pd.DataFrame(rows[start:start + 60], columns=["A", "C", "D"])
+        yield df, ["A", "C"], "germanic", ["web text"] * len(df)
+
+
+@pytest.mark.parametrize("context", [None, "fork"])
+def test_pool_matches_in_process_classification(context):
+    expected = [
+        (df["Sector"].tolist(), families)
+        for df, families in classify_frames(frames(), KEYWORDS_BY_FAMILY, unsupported="n/a")
+    ]
+    assert {"germanic", "romance", "slavic"} <= set(expected[0][1])
+
+    with ClassifyPool(KEYWORDS_BY_FAMILY, workers=2, unsupported="n/a", context=context) as pool:
+        got = [(df["Sector"].tolist(), families) for df, families in pool.classify_frames(frames(), depth=1)]
+    assert got == expected
@@ -0,0 +1,135 @@
+import io
+import json
+import zipfile
+
+import pandas as pd
+import pytest
+
+import cli
+import metrics
+import watch
+from cli import EXIT_ERROR, EXIT_OK, main
+
+
+def _touch(root, relpath, data=b"x"):
+    path = root.joinpath(*relpath.split("/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def trees(tmp_path):
+    delivery, post = tmp_path / "delivery", tmp_path / "post"
+    _touch(delivery, "a/scan_01.tif", b"one")
+    _touch(post, "a/scan_01.jpg", b"one")
+    _touch(post, "a/scan_02.jpg", b"two")
+    return delivery, post
+
+
+def _sheet(tmp_path, rows, name="list.csv"):
+    path = tmp_path / name
+    pd.DataFrame(rows, columns=list("ABCD")).to_csv(path, index=False)
+    return path
+
+
+def test_diff_lists_new_files(trees, capsys):
+    delivery, post = trees
+    assert main(["diff", str(delivery), str(post)]) == EXIT_OK
+    assert capsys.readouterr().out.splitlines() == ["a/scan_02.jpg"]
+
+
+def test_diff_matches_paths_on_request(tmp_path, capsys):
+    delivery, post = tmp_path / "delivery", tmp_path / "post"
+    _touch(delivery, "tif/scan_01.tif")
+    _touch(post, "jpg/scan_01.jpg")
+    assert main(["diff", str(delivery), str(post)]) == EXIT_OK
+    assert capsys.readouterr().out == ""
+    assert main(["diff", str(delivery), str(post), "--match-paths"]) == EXIT_OK
+    assert capsys.readouterr().out.splitlines() == ["jpg/scan_01.jpg"]
+
+
+def test_diff_zip_to_stdout(trees, capsysbinary):
+    delivery, post = trees
+    assert main(["diff", str(delivery), str(post), "--zip", "-"]) == EXIT_OK
+    z = zipfile.ZipFile(io.BytesIO(capsysbinary.readouterr().out))
+    assert z.namelist() == ["a/scan_02.jpg"] and z.read("a/scan_02.jpg") == b"two"
+
+
+def test_missing_tree_is_an_error(trees, tmp_path, capsys):
+    delivery, _ = trees
+    assert main(["diff", str(delivery), str(tmp_path / "missing")]) == EXIT_ERROR
+    assert main(["dupes", str(tmp_path / "missing")]) == EXIT_ERROR
+    assert main(["watch", str(delivery), str(tmp_path / "missing")]) == EXIT_ERROR
+    assert capsys.readouterr().err.count("error: Not a directory") == 3
+
+
+def test_dupes_report(trees, tmp_path, capsys):
+    delivery, post = trees
+    out = tmp_path / "dupes.csv"
+    assert main(["dupes", str(delivery), str(post), "-o", str(out)]) == EXIT_OK
+    report = out.read_text(encoding="utf-8")
+    assert "scan_01.tif" in report and "scan_01.jpg" in report and "scan_02" not in report
+    assert capsys.readouterr().out == ""
+
+
+def test_classify_to_stdout_and_by_extension(tmp_path, capsysbinary):
+    sheet = _sheet(tmp_path, [("Bank loans", "b", "insurance of the bank", "no url")] * 3)
+    assert main(["classify", str(sheet), "-o", "-"]) == EXIT_OK
+    df = pd.read_csv(io.BytesIO(capsysbinary.readouterr().out))
+    assert len(df) == 3 and "Sector" in df.columns
+
+    out = tmp_path / "out.xlsx"
+    assert main(["classify", str(sheet), "-o", str(out), "--processes", "2"]) == EXIT_OK
+    assert pd.read_excel(out)["Sector"].tolist() == df["Sector"].tolist()
+
+
+def test_classify_unreadable_input_maps_to_exit_error(tmp_path, capsys):
+    assert main(["classify", str(tmp_path / "missing.csv"), "-o", str(tmp_path / "a.csv")]) == EXIT_ERROR
+    corrupt = tmp_path / "broken.xlsx"
+    corrupt.write_bytes(b"not a workbook")
+    assert main(["classify", str(corrupt), "-o", str(tmp_path / "b.csv")]) == EXIT_ERROR
+    err = capsys.readouterr().err
+    assert err.count("error: cannot read") == 2
+
+
+def test_classify_parquet_without_pyarrow(tmp_path, monkeypatch, capsys):
+    import export
+
+    monkeypatch.setattr(export, "export_types", lambda: ["csv", "xlsx"])
+    sheet = _sheet(tmp_path, [("Bank", "b", "c", "d")])
+    assert main(["classify", str(sheet), "-o", str(tmp_path / "out.parquet")]) == EXIT_ERROR
+    assert "needs pyarrow" in capsys.readouterr().err
+
+
+def test_watch_reports_existing_and_writes_metrics(trees, tmp_path, monkeypatch, capsys):
+    delivery, post = trees
+    zips = tmp_path / "zips"
+    zips.mkdir()
+
+    def batches(self, stop=None, timeout=None):
+        yield []
+        raise KeyboardInterrupt         # as Ctrl-C would
+
+    monkeypatch.setattr(watch.Watcher, "batches", batches)
+    monkeypatch.setattr("signal.signal", lambda *a: None)
+    monkeypatch.setattr(metrics.registry, "enabled", metrics.registry.enabled)
+    stats = tmp_path / "metrics.json"
+    args = ["--metrics", str(stats), "watch", str(delivery), str(post), "--existing", "--zip-dir", str(zips)]
+    assert main(args) == EXIT_OK
+
+    assert capsys.readouterr().out.splitlines() == ["a/scan_02.jpg"]
+    [archive] = zips.iterdir()
+    assert zipfile.ZipFile(archive).namelist() == ["a/scan_02.jpg"]
+    json.loads(stats.read_text())
+
+
+def test_usage_errors_exit_2(capsys):
+    with pytest.raises(SystemExit) as e:
+        main(["diff"])
+    assert e.value.code == 2
+    with pytest.raises(SystemExit):
+        cli.build_parser().parse_args(["nope"])
+    for poll in ("0", "-1", "nan"):
+        with pytest.raises(SystemExit):
+            cli.build_parser().parse_args(["watch", "a", "b", "--poll", poll])
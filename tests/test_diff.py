@@ -0,0 +1,53 @@
+import io
+
+import fingerprint
+from diff import find_changed_files, normalize
+from fingerprint import BLOCK_SIZE, identical_groups
+
+BIG = bytes(range(256)) * 1024          # larger than both hashed end blocks
+
+
+def middle_changed(data):
+    # Same size, same first and last blocks: only the full hash tells them apart.
+    mid = len(data) // 2
+    return data[:mid] + bytes([data[mid] ^ 0xFF]) + data[mid + 1:]
+
+
+def test_same_size_different_content_is_changed():
+    new, changed = find_changed_files(
+        {"a.txt": b"aaaa", "b.txt": b"same"},
+        {"A.csv": b"bbbb", "b.csv": b"same", "c.csv": b"new"},
+    )
+    assert [n for n, _ in new] == ["c.csv"]
+    assert [n for n, _ in changed] == ["A.csv"]
+
+
+def test_matching_partial_hash_with_different_full_hash(monkeypatch):
+    assert len(BIG) > 2 * BLOCK_SIZE
+    edited = middle_changed(BIG)
+    assert fingerprint.partial_hash(BIG, len(BIG)) == fingerprint.partial_hash(edited, len(edited))
+
+    full = []
+    real = fingerprint.full_hash
+    monkeypatch.setattr(fingerprint, "full_hash", lambda s: full.append(s) or real(s))
+
+    _, changed = find_changed_files({"x.tif": BIG, "y.tif": BIG}, {"x.jpg": edited, "y.jpg": io.BytesIO(BIG)})
+    assert [n for n, _ in changed] == ["x.jpg"]
+    assert len(full) == 4                # only the big files that survived the partial stage
+
+
+def test_stages_skip_reads_once_sizes_differ(monkeypatch):
+    monkeypatch.setattr(fingerprint, "partial_hash", lambda *a: 1 / 0)
+    assert identical_groups([[("a", b"1"), ("b", b"22")]]) == []
+
+
+def test_key_parameter_decides_what_is_compared():
+    delivery = {"v1/scan.tif": b"old", "v2/scan.tif": b"x"}
+    post = {"v1/scan.jpg": b"old", "v3/scan.jpg": b"x"}
+
+    new, changed = find_changed_files(delivery, post)
+    assert [n for n, _ in new] == ["v3/scan.jpg"] and changed == []
+
+    # On the file name alone, v3/scan.jpg meets both deliveries and matches v2's bytes.
+    new, changed = find_changed_files(delivery, post, key=lambda n: normalize(n.rsplit("/", 1)[-1]))
+    assert new == [] and changed == []
@@ -0,0 +1,33 @@
+import io
+
+from duplicates import find_duplicates, write_report
+
+BIG = bytes(range(256)) * 1024          # larger than both hashed end blocks
+
+
+def test_clusters_span_folders_and_skip_empty_files():
+    folders = {
+        "A": {"x.bin": BIG, "copy.bin": BIG, "empty": b"", "solo": b"only in A"},
+        "B": {"renamed.bin": BIG, "empty2": b"", "near.bin": BIG + b"!"},
+    }
+    clusters = find_duplicates(folders)
+    assert [[(f, n) for f, n, _ in c] for c in clusters] == [
+        [("A", "copy.bin"), ("A", "x.bin"), ("B", "renamed.bin")]
+    ]
+
+
+def test_within_folder_and_empty_clusters_are_opt_in():
+    folders = {"A": {"a": b"same", "b": b"same", "e1": b""}, "B": {"e2": b""}}
+    assert find_duplicates(folders) == []
+
+    clusters = find_duplicates(folders, cross_folder=False, min_size=0)
+    assert sorted(sorted(n for _, n, _ in c) for c in clusters) == [["a", "b"], ["e1", "e2"]]
+
+
+def test_report_numbers_clusters():
+    buf = io.StringIO()
+    rows = write_report(find_duplicates({"A": {"a": b"data"}, "B": {"b": b"data"}}), buf)
+    assert rows == 2
+    assert buf.getvalue().splitlines() == [
+        "cluster,folder,filename,size", "1,A,a,4", "1,B,b,4"
+    ]
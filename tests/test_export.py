@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from export import export_format, open_writer
+from ingest import read_table
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx", "parquet"])
+def test_chunks_append_into_one_table(tmp_path, fmt):
+    chunks = [
+        pd.DataFrame({"A": ["a", "b\x01"], "Sector": ["Finance", None]}),
+        pd.DataFrame({"A": [np.nan, np.nan], "Sector": ["Health", "Law"]}),
+    ]
+    path = tmp_path / f"out.{fmt}"
+    with open(path, "wb") as f:
+        writer = open_writer(f, export_format(path.name))
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.close()
+
+    got = read_table(str(path))
+    assert got.columns.tolist() == ["A", "Sector"]
+    assert got["Sector"].isna().tolist() == [False, True, False, False]
+    assert got["Sector"].dropna().tolist() == ["Finance", "Health", "Law"]
+    assert got["A"].iloc[0] == "a" and got["A"].iloc[2:].isna().all()
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from classify import normalize
+from fetcher import FetchStream, extraction_variant, fetch_texts, is_fetchable
+from pagecache import PageCache, cache_key
+
+MALFORMED = ["http://example.com:abc/", "http://[::1/x", "http://example.com:99999/"]
+
+
+def test_malformed_urls_are_not_fetchable():
+    for url in MALFORMED:
+        assert not is_fetchable(url)
+        assert cache_key(url) is None
+    assert is_fetchable("https://example.com:8443/a#top")
+
+
+def test_malformed_urls_in_a_cached_batch(tmp_path):
+    with PageCache(str(tmp_path / "pages.sqlite3")) as cache:
+        variant = extraction_variant(256 * 1024)
+        cache.store("http://cached.test/", "cached text", variant=variant)
+        for url in MALFORMED:
+            cache.store(url, "never kept", variant=variant)
+            assert cache.lookup(url, variant) is None
+
+        texts = fetch_texts(["http://cached.test/"] + MALFORMED, cache=cache, max_bytes=256 * 1024)
+        assert texts == ["cached text", "", "", ""]
+        assert cache.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 1
+
+
+class Server:
+    # Local pages: /slow/... waits for release, anything else answers at
+    # once. Tracks how many requests each Host has open at a time.
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.open, self.peak = Counter(), Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                host = self.headers["Host"].split(":")[0]
+                with server.lock:
+                    server.open[host] += 1
+                    server.peak[host] = max(server.peak[host], server.open[host])
+                if self.path.startswith("/slow"):
+                    server.release.wait(10)
+                else:
+                    time.sleep(0.05)
+                with server.lock:
+                    server.open[host] -= 1
+                body = f"<html><body><p>page {self.path}</p></body></html>".encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, host, path):
+        return f"http://{host}:{self.port}{path}"
+
+
+def page(path):
+    # The text the fetcher extracts from a page served by Server.
+    return normalize(f"page {path}")
+
+
+def stripped(texts):
+    return [text.strip() for text in texts]
+
+
+@pytest.fixture
+def server():
+    server = Server()
+    yield server
+    server.release.set()
+    server.httpd.shutdown()
+
+
+def test_later_batch_is_not_held_up_by_an_earlier_one(server):
+    with FetchStream(per_host=2) as stream:
+        slow = stream.submit([server.url("127.0.0.1", "/slow/1")])
+        fast = stream.submit([server.url("localhost", "/a"), server.url("localhost", "/b")])
+        assert stripped(fast.future.result(timeout=5)) == [page("/a"), page("/b")]
+        assert not slow.future.done()
+        server.release.set()
+        assert stripped(slow.wait()) == [page("/slow/1")]
+
+
+def test_per_host_limit_holds_across_batches(server):
+    with FetchStream(per_host=2) as stream:
+        batches = [
+            stream.submit([server.url(host, f"/{n}/{i}") for i in range(6) for host in ("127.0.0.1", "localhost")])
+            for n in range(3)
+        ]
+        for n, batch in enumerate(batches):
+            assert stripped(batch.wait()) == [page(f"/{n}/{i}") for i in range(6) for _ in range(2)]
+    assert server.peak["127.0.0.1"] == server.peak["localhost"] == 2
+
+
+def test_close_finishes_batches_in_flight(server):
+    stream = FetchStream()
+    batch = stream.submit([server.url("127.0.0.1", "/slow/1"), server.url("127.0.0.1", "/x"), "not a url"])
+    threading.Timer(0.2, server.release.set).start()
+    stream.close()
+    assert batch.future.done()
+    assert stripped(batch.wait()) == [page("/slow/1"), page("/x"), ""]
+    stream.close()              # a second close is a no-op
@@ -0,0 +1,25 @@
+from fuzzy import NameIndex, name_key, near_misses
+
+
+def test_separator_variants_share_a_key():
+    assert name_key("report_v2_final.jpg") == name_key("Report-v2 final.tif") == "report v2 final"
+
+
+def test_best_match_and_threshold():
+    rows = near_misses(
+        ["report-v2-final.tif", "reprot_v2_final.pdf", "totally_else.jpg"],
+        ["report_v2_final.jpg", "summary.doc"],
+    )
+    assert rows[0] == ("report-v2-final.tif", "report_v2_final.jpg", 1.0)
+    assert rows[1][1] == "report_v2_final.jpg" and 0.6 <= rows[1][2] < 1.0
+    assert rows[2] == ("totally_else.jpg", None, 0.0)
+
+
+def test_typos_are_found_among_many_names():
+    names = [f"box_{i:05d}_letter_scan.tif" for i in range(5000)]
+    index = NameIndex(names)
+    assert index.best_match("box_01234_leter_scan.jpg") == (
+        "box_01234_letter_scan.tif", index.best_match("box_01234_leter_scan.jpg")[1]
+    )
+    assert index.best_match("box_01234_leter_scan.jpg")[1] > 0.8
+    assert NameIndex([]).best_match("anything") == (None, 0.0)
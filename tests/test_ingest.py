@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from ingest import iter_table, read_table
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "A": [f"name {i}" for i in range(12)],
+        "B": range(12),
+        "C": ["desc"] * 11 + [None],
+        "D": [f"http://x{i}.example" for i in range(12)],
+    })
+
+
+@pytest.mark.parametrize("ext", ["xlsx", "csv", "parquet"])
+def test_selected_columns_match_pandas(tmp_path, frame, ext):
+    path = tmp_path / f"t.{ext}"
+    if ext == "xlsx":
+        frame.to_excel(path, index=False)
+    elif ext == "csv":
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_parquet(path)
+
+    chunks = list(iter_table(str(path), columns=[0, 2, 3], chunk_rows=5))
+    assert [len(c) for c in chunks] == [5, 5, 2]
+
+    got = read_table(str(path), columns=[0, 2, 3])
+    expected = frame.iloc[:, [0, 2, 3]]
+    assert list(got.columns) == ["A", "C", "D"]
+    assert got.astype(object).map(str).values.tolist() == expected.astype(object).map(str).values.tolist()
+
+
+def test_too_few_columns_is_a_value_error(tmp_path):
+    path = tmp_path / "narrow.csv"
+    pd.DataFrame({"a": [1], "b": [2]}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        next(iter_table(str(path), columns=[0, 2, 3]))
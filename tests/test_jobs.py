@@ -0,0 +1,72 @@
+import io
+import json
+import os
+
+import pandas as pd
+
+import classify
+import jobs
+from ingest import read_table
+
+
+def upload(rows):
+    buf = io.BytesIO()
+    pd.DataFrame(rows, columns=list("ABCD")).to_csv(buf, index=False)
+    buf.seek(0)
+    return buf
+
+
+def test_job_resumes_after_last_checkpoint(tmp_path, monkeypatch):
+    rows = [(f"Bank loans {i}", "b", f"insurance of the bank {i}", "no url") for i in range(12_000)]
+    job = jobs.ClassifyJob.create(upload(rows), "list.csv", root=str(tmp_path))
+    job.run()
+    full = job.result()
+    with open(job.export("csv"), "rb") as f:
+        full_csv = f.read()
+    assert job.state()["status"] == "done" and job.state()["parts"] == 3
+
+    # As if the process died after the first chunk was checkpointed, with
+    # part of the second chunk already appended to the CSV.
+    state = job.state()
+    first_chunk = len(b"".join(full_csv.splitlines(keepends=True)[:5_001]))
+    state.update(status="running", parts=1, part_rows=[5_000], csv_bytes=first_chunk,
+                 rows_done=5_000, family_counts={"germanic": 5_000})
+    with open(os.path.join(job.path, "state.json"), "w") as f:
+        json.dump(state, f)
+    os.remove(job.part_path(2))
+
+    classified = []
+    real = classify.classify_frames
+
+    def counting(frames, *args, **kwargs):
+        for df, families in real(frames, *args, **kwargs):
+            classified.append(len(df))
+            yield df, families
+
+    monkeypatch.setattr(classify, "classify_frames", counting)
+    again = jobs.ClassifyJob.create(upload(rows), "list.csv", root=str(tmp_path))
+    assert again.id == job.id
+    again.run()
+
+    assert classified == [5_000, 2_000]
+    assert again.state()["rows_done"] == 12_000
+    pd.testing.assert_frame_equal(again.result(), full)
+    with open(again.export("csv"), "rb") as f:
+        assert f.read() == full_csv
+
+
+def test_pages_and_exports_read_from_parts(tmp_path):
+    rows = [(f"Bank loans {i}", "b", f"insurance of the bank {i}", "no url") for i in range(12_000)]
+    job = jobs.ClassifyJob.create(upload(rows), "list.csv", root=str(tmp_path))
+    job.run()
+    full = job.result()
+
+    page = job.rows(4_990, 5_010)
+    assert page.index.tolist() == list(range(4_990, 5_010))
+    pd.testing.assert_frame_equal(page.reset_index(drop=True), full.iloc[4_990:5_010].reset_index(drop=True))
+    assert len(job.rows(11_900, 12_500)) == 100 and job.rows(12_000, 12_100).empty
+
+    for fmt in ("csv", "xlsx", "parquet"):
+        exported = read_table(job.export(fmt))
+        assert exported.shape == full.shape
+        assert exported["Sector"].tolist() == full["Sector"].tolist()
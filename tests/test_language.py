@@ -0,0 +1,52 @@
+import language
+from language import FAMILY_CHARS, MIN_ROUTE_LETTERS, route_families
+
+
+def test_short_rows_inherit_the_document_family():
+    assert route_families(["", "GmbH", "12345 678", "a" * (MIN_ROUTE_LETTERS - 1)], default="romance") == [
+        "romance", "romance", "romance", "romance",
+    ]
+
+
+def test_cyrillic_and_family_letters_decide_alone():
+    rows = [
+        "Банк и страхование",
+        "Bäckerei an der Hauptstraße",
+        "Panadería artesanal del año",
+        "Sklep spożywczy Łódź centrum",
+        "Šilumos tiekimo paslaugos ūkis",
+    ]
+    assert route_families(rows, default="uralic") == ["slavic", "germanic", "romance", "slavic", "baltic"]
+    for family, chars in FAMILY_CHARS.items():
+        assert route_families([f"xxxxxxxxxxxxxx {chars[0]}"]) == [family]
+
+
+def test_stopwords_need_hits_and_a_clear_margin(monkeypatch):
+    monkeypatch.setattr(language, "_detect_family", lambda text: None)
+    rows = [
+        "Shop for the best coffee and tea with our team",
+        "Boutique pour les amis avec des produits du jour",
+        "Kauppa ja kahvila kanssa hyvää ruokaa",
+        "Coffee shop Mendoza Station",          # no stopwords: falls back
+        "Coffee with milk and la carte pour",   # two hits each: no clear winner
+    ]
+    assert route_families(rows, default="celtic") == ["germanic", "romance", "uralic", "celtic", "celtic"]
+
+
+def test_unclear_rows_go_to_langdetect_once_per_text(monkeypatch):
+    asked = []
+    monkeypatch.setattr(language, "_detect_family", lambda text: asked.append(text) or "romance")
+    rows = ["Ristorante Bella Napoli", "  ristorante   BELLA napoli ", "Ristorante Bella Napoli", "Hotel"]
+    assert route_families(rows, default="germanic") == ["romance", "romance", "romance", "germanic"]
+    assert asked == ["ristorante bella napoli"]
+
+
+def test_classification_routes_each_row_and_falls_back_to_the_document_family():
+    import pandas as pd
+
+    from classify import classify_frames
+    from keywords import KEYWORDS_BY_FAMILY
+
+    df = pd.DataFrame({"A": ["Банк кредиты страхование", "Hôtel à Genève", "Bank", ""]})
+    [(_, families)] = classify_frames([(df, ["A"], "germanic", None)], KEYWORDS_BY_FAMILY)
+    assert families == ["slavic", "romance", "germanic", "germanic"]
@@ -0,0 +1,36 @@
+import pytest
+
+from diff import find_new_files
+from manifest import DeliveryManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    with DeliveryManifest(str(tmp_path / "manifest.sqlite3")) as m:
+        yield m
+
+
+def test_commit_round_records_normalized_names_once(manifest):
+    first = manifest.commit_round("2026-01", {"Scan_01.TIF": b"abc", "scan_01.jpg": b"x"})
+    second = manifest.commit_round("2026-02", ["Scan_02.tif"])
+    assert [(r[0], r[1], r[3]) for r in manifest.rounds()] == [(first, "2026-01", 1), (second, "2026-02", 1)]
+    with pytest.raises(ValueError):
+        manifest.commit_round("2026-01", ["again.tif"])
+
+
+def test_round_filter_limits_filenames_and_new_files(manifest):
+    first = manifest.commit_round("r1", ["a.tif", "b.tif"])
+    second = manifest.commit_round("r2", ["c.tif"])
+    post = {"A.jpg": 1, "c.jpg": 2, "d.jpg": 3}
+
+    assert sorted(manifest.filenames()) == ["a.tif", "b.tif", "c.tif"]
+    assert list(manifest.filenames(rounds=[second])) == ["c.tif"]
+    assert manifest.find_new_files(post, rounds=[first]) == [("c.jpg", 2), ("d.jpg", 3)]
+    assert manifest.find_new_files(post, rounds=[]) == list(post.items())
+
+
+def test_find_new_files_matches_diff(manifest):
+    delivered = ["Report Final.PDF", "img_001.tif", "img_002.tif", "notes"]
+    manifest.commit_round("r1", delivered)
+    post = {"report final.docx": 1, "IMG_001.jpg": 2, "img_003.jpg": 3, "Notes.txt": 4, "other": 5}
+    assert manifest.find_new_files(post) == find_new_files(delivered, post)
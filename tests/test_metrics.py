@@ -0,0 +1,21 @@
+from metrics import Metrics
+
+
+def test_disabled_registry_records_nothing():
+    m = Metrics(enabled=False)
+    m.observe("stage", 0.5)
+    m.count("bytes", 10)
+    assert m.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_prometheus_buckets_are_cumulative():
+    m = Metrics(enabled=True)
+    for seconds in (0.002, 0.002, 3.0):
+        m.observe("fetch", seconds)
+    m.count("page_cache_hits", 3)
+    m.count("page_cache_misses")
+    text = m.to_prometheus()
+    assert 'porticus_stage_seconds_bucket{stage="fetch",le="0.005"} 2' in text
+    assert 'porticus_stage_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert "porticus_page_cache_hits_total 3" in text
+    assert m.snapshot()["counters"]["page_cache_hit_rate"] == 0.75
@@ -0,0 +1,57 @@
+import random
+
+from diff import find_new_files, normalize
+from manifest import DeliveryManifest
+from nameindex import DeliveredIndex
+from scan import delivered_index
+
+
+def names(n, rng):
+    return [f"Scan {rng.randrange(n * 2):06d}.{rng.choice(['tif', 'JPG', 'pdf'])}" for _ in range(n)]
+
+
+def reference(delivered, postprocessed):
+    # find_new_files as a set of normalized names.
+    delivered = {normalize(name) for name in delivered}
+    return [(f, d) for f, d in postprocessed.items() if normalize(f) not in delivered]
+
+
+def test_index_matches_set_in_memory_spilled_and_on_disk(tmp_path):
+    rng = random.Random(1)
+    delivered = names(20_000, rng)
+    postprocessed = {name: i for i, name in enumerate(names(20_000, rng))}
+    expected = reference(delivered, postprocessed)
+    keys = [normalize(name) for name in delivered]
+
+    assert find_new_files(delivered, postprocessed) == expected
+    spilled = DeliveredIndex.build(keys, run_size=3_000)
+    assert find_new_files(spilled, postprocessed) == expected
+
+    path = str(tmp_path / "delivered.idx")
+    DeliveredIndex.build(keys, path=path, run_size=3_000)
+    opened = DeliveredIndex.open(path)
+    assert opened.bloom is not None and len(opened) == len(set(keys))
+    assert find_new_files(opened, postprocessed) == expected
+
+
+def test_manifest_rounds_as_index(tmp_path):
+    with DeliveryManifest(str(tmp_path / "m.sqlite3")) as manifest:
+        manifest.commit_round("r1", ["A.tif", "b.jpg"])
+        index = manifest.name_index()
+    assert "a" in index and "c" not in index
+    assert find_new_files(index, {"a.pdf": 1, "C.tif": 2}) == [("C.tif", 2)]
+    assert find_new_files(DeliveredIndex.build([]), {"a.pdf": 1}) == [("a.pdf", 1)]
+
+
+def test_empty_index_on_disk(tmp_path):
+    path = str(tmp_path / "empty.idx")
+    index = DeliveredIndex.build([], path=path)
+    assert len(index) == 0 and "a" not in index
+    assert len(DeliveredIndex.open(path)) == 0
+
+    empty = tmp_path / "delivery"
+    empty.mkdir()
+    assert len(delivered_index(str(empty), path=str(tmp_path / "tree.idx"))) == 0
+    with DeliveryManifest(str(tmp_path / "m.sqlite3")) as manifest:
+        index = manifest.name_index(path=str(tmp_path / "manifest.idx"))
+    assert find_new_files(index, {"a.pdf": 1}) == [("a.pdf", 1)]
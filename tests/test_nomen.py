@@ -0,0 +1,48 @@
+import itertools
+import re
+import unicodedata
+
+from nomen import compile_normalizer, rename_plan
+
+
+def stepwise(filename, lower, spaces, accents, special, collapse):
+    # Nomen's original rule-by-rule pipeline.
+    name, ext = filename.rsplit(".", 1)
+    if accents:
+        name = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    if lower:
+        name = name.lower()
+    if spaces:
+        name = name.replace(" ", "_")
+    if special:
+        name = re.sub(r"[^a-zA-Z0-9_\-]", "", name)
+    if collapse:
+        name = re.sub(r"[_\-]{2,}", "_", name)
+    return f"{name}.{ext}"
+
+
+NAMES = ["Été à Noël.JPG", "ΟΔΥΣΣΕΥΣ (1).pdf", "İstanbul__–__ﬁnal ①.tif", "a  b--c.d.png", "ÅØ 漢字.zip"]
+
+
+def test_compiled_normalizer_matches_stepwise_rules():
+    for options in itertools.product([True, False], repeat=5):
+        normalize = compile_normalizer(*options)
+        for name in NAMES:
+            assert normalize(name) == stepwise(name, *options)
+
+
+def test_collisions_get_numbered_archive_names():
+    renames, collisions = rename_plan(("Café.jpg", "cafe.jpg", "cafe_2.jpg", "README"))
+    assert collisions == {"cafe.jpg": ["Café.jpg", "cafe.jpg"]}
+    assert [final for _, _, final in renames] == ["cafe.jpg", "cafe_3.jpg", "cafe_2.jpg", "readme"]
+
+
+def test_normalizer_memo_is_bounded(monkeypatch):
+    import nomen
+
+    monkeypatch.setattr(nomen, "MEMO_SIZE", 10)
+    normalize = nomen.FilenameNormalizer()
+    names = [f"Scan {i}.TIF" for i in range(25)]
+    assert [normalize(name) for name in names] == [f"scan_{i}.TIF" for i in range(25)]
+    assert len(normalize._memo) <= 10
+    assert normalize(names[0]) == "scan_0.TIF"
@@ -0,0 +1,45 @@
+from scan import delivered_names, iter_new_files, list_files, name_key, path_key
+
+
+def _touch(root, relpath, data=b"x"):
+    path = root.joinpath(*relpath.split("/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def test_path_key_strips_extension_from_last_component_only():
+    assert path_key("v1.0/README") == "v1.0/readme"
+    assert path_key("v1.txt") == "v1"
+    assert path_key("Sub/Scan_01.TIF") == "sub/scan_01"
+    assert name_key("Sub/Scan_01.TIF") == "scan_01"
+
+
+def test_dotted_directories_do_not_hide_new_files(tmp_path):
+    delivery, post = tmp_path / "delivery", tmp_path / "post"
+    _touch(delivery, "v1.0/README")
+    _touch(post, "v1.0/README.md")
+    _touch(post, "v1.5/NOTES")
+    _touch(post, "v1.txt")
+
+    new = sorted(rel for rel, _ in iter_new_files(str(delivery), str(post)))
+    assert new == ["v1.5/NOTES", "v1.txt"]
+
+
+def test_scan_lists_nested_files(tmp_path):
+    for rel in ("a.jpg", "s/b.jpg", "s/t/c.jpg"):
+        _touch(tmp_path, rel)
+
+    assert sorted(list_files(str(tmp_path))) == ["a.jpg", "s/b.jpg", "s/t/c.jpg"]
+    assert delivered_names(str(tmp_path)) == {"a", "b", "c"}
+    assert delivered_names(str(tmp_path), match_paths=True) == {"a", "s/b", "s/t/c"}
+
+
+def test_file_names_match_across_layouts_unless_paths_are_asked_for(tmp_path):
+    delivery, post = tmp_path / "delivery", tmp_path / "post"
+    _touch(delivery, "2024/batch_a/Scan_01.TIF")
+    _touch(post, "jpg/scan_01.jpg")
+    _touch(post, "jpg/scan_02.jpg")
+
+    assert sorted(rel for rel, _ in iter_new_files(str(delivery), str(post))) == ["jpg/scan_02.jpg"]
+    new = sorted(rel for rel, _ in iter_new_files(str(delivery), str(post), match_paths=True))
+    assert new == ["jpg/scan_01.jpg", "jpg/scan_02.jpg"]
@@ -0,0 +1,77 @@
+import errno
+import os
+import time
+
+import pytest
+
+from nameindex import DeliveredIndex
+from scan import delivered_index
+from watch import Watcher, _Inotify
+
+
+def _touch(root, relpath, data=b"x"):
+    path = root.joinpath(*relpath.split("/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def arrivals(watcher, expected, deadline=5.0):
+    got, until = [], time.monotonic() + deadline
+    for batch in watcher.batches(timeout=0.05):
+        got += [rel for rel, _ in batch]
+        if len(got) >= expected or time.monotonic() > until:
+            return sorted(got)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_reports_each_undelivered_arrival_once(tmp_path, use_inotify):
+    root = tmp_path / "post"
+    _touch(root, "s/old.tif")
+    _touch(root, "s/Done.tif")
+    delivered = DeliveredIndex.build(["done", "later"])
+
+    with Watcher(str(root), delivered, poll_interval=0.05, use_inotify=use_inotify) as watcher:
+        assert [rel for rel, _ in watcher.existing] == ["s/old.tif"]
+        _touch(root, "s/new.txt")
+        _touch(root, "s/later.jpg")
+        _touch(root, "s/old.jpg")
+        _touch(root, "n/deep/a.pdf")
+        _touch(root, "x.tmp")
+        os.replace(root / "x.tmp", root / "x.tif")
+
+        assert arrivals(watcher, 4) == ["n/deep/a.pdf", "s/new.txt", "s/old.jpg", "x.tif"]
+        _touch(root, "s/new.txt", b"rewritten")
+        assert arrivals(watcher, 1, deadline=0.5) == []
+
+
+@pytest.mark.parametrize("match_paths", [False, True])
+def test_names_match_across_layouts_unless_paths_are_asked_for(tmp_path, match_paths):
+    delivery, root = tmp_path / "delivery", tmp_path / "post"
+    _touch(delivery, "2024/Scan_01.TIF")
+    _touch(root, "jpg/scan_01.jpg")
+    delivered = delivered_index(str(delivery), match_paths=match_paths)
+
+    with Watcher(str(root), delivered, poll_interval=0.05, match_paths=match_paths) as watcher:
+        assert [rel for rel, _ in watcher.existing] == (["jpg/scan_01.jpg"] if match_paths else [])
+        _touch(root, "other/scan_01.png")
+        _touch(root, "other/scan_02.png")
+        expected = ["other/scan_01.png", "other/scan_02.png"] if match_paths else ["other/scan_02.png"]
+        assert arrivals(watcher, len(expected)) == expected
+
+
+def test_falls_back_to_polling_when_a_new_directory_cannot_be_watched(tmp_path, monkeypatch):
+    root = tmp_path / "post"
+    root.mkdir()
+    failures = []
+    with Watcher(str(root), DeliveredIndex.build([]), poll_interval=0.05, on_fallback=failures.append) as watcher:
+        assert watcher.mode == "inotify"
+
+        def add(self, path):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+        monkeypatch.setattr(_Inotify, "add", add)
+        _touch(root, "a.tif")
+        _touch(root, "new/deep/b.tif")
+        assert arrivals(watcher, 2) == ["a.tif", "new/deep/b.tif"]
+        assert watcher.mode == "polling"
+        assert [e.errno for e in failures] == [errno.ENOSPC]
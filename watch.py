@@ -0,0 +1,251 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from scan import _list_dir, match_key
+
+IDLE_TIMEOUT = 1.0              # seconds without events before an empty batch is yielded
+POLL_INTERVAL = 5.0             # seconds between scans when inotify is unavailable
+MTIME_SLACK = 2.0               # directories changed this recently are listed again (coarse clocks)
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+
+class _Inotify:
+    # The three inotify calls through ctypes; raises OSError where they are
+    # missing or fail (not Linux, no libc, out of watches).
+    def __init__(self):
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True) if name else None
+        if libc is None or not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            self._raise()
+        self.dirs = {}          # watch descriptor -> directory path
+
+    def _raise(self):
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    def add(self, path: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            self._raise()
+        self.dirs[wd] = path
+
+    def read(self):
+        # (directory, name, mask) for every queued event.
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, size = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + size].rstrip(b"\0"))
+            offset += size
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            yield self.dirs.get(wd), name, mask
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher:
+    # New files below a postprocessed tree, matched like Comparatio on the
+    # normalized file name (scan.name_key), or on scan.path_key with
+    # match_paths. delivered is a DeliveredIndex of the same keys:
+    # scan.delivered_index(root, match_paths=...) or, for names,
+    # DeliveryManifest.name_index(). The tree is read once up front
+    # (undelivered files found then are in .existing); after that only
+    # changes cost anything: inotify events on Linux, else a poll that
+    # lists just the directories whose mtime moved. Each file is reported
+    # once, when complete: closed after writing or moved into place under
+    # inotify, unchanged over two polls otherwise. Should inotify fail
+    # later on (out of watches, dropped events that cannot be relisted),
+    # the watcher calls on_fallback(error) and polls from then on.
+    def __init__(self, root: str, delivered, poll_interval: float = POLL_INTERVAL,
+                 use_inotify: bool = True, match_paths: bool = False, on_fallback=None):
+        if not os.path.isdir(root):
+            raise NotADirectoryError(f"Not a directory: {root}")
+        self.root = root
+        self.delivered = delivered
+        self.poll_interval = poll_interval
+        self.on_fallback = on_fallback
+        self._key = match_key(match_paths)
+        self._prefix = len(os.path.join(root, ""))
+        self._seen = set()      # relative paths of undelivered files already reported
+        self._dirs = {}         # directory -> (mtime, subdirectories), polling only
+        self._pending = {}      # relative path -> (entry, size, mtime) waiting to settle, polling only
+        self._inotify = None
+
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                files = self._watch_tree(root)
+            except OSError:
+                if self._inotify is not None:
+                    self._inotify.close()
+                self._inotify = None
+        if self._inotify is None:
+            files = self._changed_files()
+        self.existing = self._accept(files)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entry(self, path: str):
+        return path[self._prefix:].replace(os.sep, "/"), path
+
+    def _accept(self, entries):
+        # The entries neither delivered nor reported before; marks them
+        # reported. Only undelivered files are remembered.
+        fresh = []
+        for rel, path in self._undelivered(entries):
+            if rel not in self._seen:
+                self._seen.add(rel)
+                fresh.append((rel, path))
+        return fresh
+
+    def _undelivered(self, entries):
+        entries = [entry for entry in entries if entry[0] not in self._seen]
+        return self.delivered.missing(entries, key=lambda entry: self._key(entry[0]))
+
+    def batches(self, stop=None, timeout: float = IDLE_TIMEOUT):
+        # Lists of new (relative path, path) as they land, an empty list
+        # after each quiet spell so callers can act on time. Ends once the
+        # stop event is set.
+        while stop is None or not stop.is_set():
+            if self._inotify is not None:
+                ready, _, _ = select.select([self._inotify.fd], [], [], timeout)
+                yield self._accept(self._events()) if ready else []
+            else:
+                time.sleep(self.poll_interval)
+                yield self._poll()
+
+    # inotify
+
+    def _watch_tree(self, top: str):
+        # Each directory is watched before it is listed, so nothing created
+        # in between goes unseen.
+        files, stack = [], [top]
+        while stack:
+            path = stack.pop()
+            self._inotify.add(path)
+            names, dirs = _list_dir(path)
+            files += map(self._entry, names)
+            stack += dirs
+        return files
+
+    def _fall_back(self, error: OSError):
+        # From now on the tree is polled; the first poll lists all of it, so
+        # whatever inotify missed is still found (files already reported
+        # are not reported again).
+        self.close()
+        self._dirs = {}
+        if self.on_fallback is not None:
+            self.on_fallback(error)
+
+    def _events(self):
+        files = []
+        for directory, name, mask in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: list the whole tree once more.
+                top = self.root
+            elif directory is None:
+                continue
+            elif not mask & IN_ISDIR:
+                # A temporary file renamed into place since its event is
+                # reported under its final name only.
+                path = os.path.join(directory, name)
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and os.path.exists(path):
+                    files.append(self._entry(path))
+                continue
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                # Files already inside a new directory are taken as they are.
+                top = os.path.join(directory, name)
+            else:
+                continue
+
+            try:
+                files += self._watch_tree(top)
+            except OSError as e:
+                # A directory gone again before it could be watched is fine;
+                # anything else (out of watches) leaves part of the tree unseen.
+                if os.path.isdir(top):
+                    self._fall_back(e)
+                    return files
+        return files
+
+    # polling
+
+    def _changed_files(self):
+        # Files of every directory created or modified since the last call;
+        # the others only cost a stat.
+        files, stack, dirs = [], [self.root], {}
+        now = time.time()
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            held = self._dirs.get(path)
+            if held is not None and held[0] == mtime and now - mtime > MTIME_SLACK:
+                subdirs = held[1]
+            else:
+                names, subdirs = _list_dir(path)
+                files += map(self._entry, names)
+            dirs[path] = (mtime, subdirs)
+            stack += subdirs
+        self._dirs = dirs
+        return files
+
+    def _poll(self):
+        for rel, path in self._undelivered(self._changed_files()):
+            self._pending.setdefault(rel, ((rel, path), None, None))
+
+        settled = []
+        for key, (entry, size, mtime) in list(self._pending.items()):
+            try:
+                st = os.stat(entry[1])
+            except OSError:
+                del self._pending[key]
+                continue
+            if (st.st_size, st.st_mtime) == (size, mtime):
+                del self._pending[key]
+                settled.append(entry)
+            else:
+                self._pending[key] = (entry, st.st_size, st.st_mtime)
+        return self._accept(settled)